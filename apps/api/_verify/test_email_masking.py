@@ -0,0 +1,53 @@
+"""
+Verifiering: e-postadresser maskas hela, oavsett längd på lokal del eller domän.
+Ingen rå content loggas.
+"""
+
+from security_core.privacy_shield.leak_check import check_leaks
+from security_core.privacy_shield.regex_mask import regex_masker
+from text_processing import mask_text, pii_gate_check, process_transcript
+
+
+def test_privacy_shield_masks_long_local_part():
+    masked, _, _ = regex_masker.mask("kontakt: " + "a" * 65 + "@example.com")
+    assert masked == "kontakt: [EMAIL]"
+    check_leaks(masked)
+
+
+def test_privacy_shield_masks_long_dotted_local_part():
+    masked, _, _ = regex_masker.mask("x " + "john.doe." * 8 + "x@example.com")
+    assert masked == "x [EMAIL]"
+
+
+def test_privacy_shield_masks_long_domain():
+    masked, _, _ = regex_masker.mask("a@" + "b" * 256 + ".se")
+    assert masked == "[EMAIL]"
+    assert regex_masker.contains_pii("a@" + "b" * 256 + ".se")
+
+
+def test_privacy_shield_long_run_without_email_is_fast():
+    # Regression guard: long runs without a usable "@" must not be rescanned per start position
+    masked, _, _ = regex_masker.mask("a@" + "a." * 25000)
+    assert "[EMAIL]" not in masked
+
+
+def test_mask_text_masks_long_local_part_and_passes_gate():
+    masked = mask_text("kontakt: " + "a" * 65 + "@example.com", level="normal")
+    assert masked == "kontakt: [EMAIL]"
+    assert pii_gate_check(masked) == (True, [])
+
+
+def test_mask_text_masks_long_domain():
+    assert mask_text("a@" + "b" * 256 + ".se", level="normal") == "[EMAIL]"
+    assert mask_text("a@" + "b" * 256 + ".se", level="paranoid") == "[LINK]"
+
+
+def test_gate_detects_long_email():
+    assert pii_gate_check("a" * 65 + "@" + "b" * 256 + ".se") == (False, ["email_detected"])
+
+
+def test_process_transcript_masks_whole_long_email():
+    local = "anna" + "x" * 70
+    result = process_transcript(f"Mejla {local}@example.com idag", "Projekt", "2026-01-06")
+    assert "anna" not in result
+    assert "Mejla [EMAIL] idag" in result
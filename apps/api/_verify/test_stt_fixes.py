@@ -0,0 +1,20 @@
+"""
+Verifiering: STT-rättningarna körs i ordning, som en re.sub per mappning.
+Ingen rå content loggas.
+"""
+
+from text_processing import normalize_transcript_text
+
+
+def test_stt_fixes_cascade():
+    # "bort dem" -> "bortom det här" ger en ny träff för "det här"
+    assert normalize_transcript_text("vi gick bort dem det här var bra") == "Vi gick bortom detta var bra"
+
+
+def test_stt_fixes_earlier_mapping_wins():
+    # "längt" kommer före "längt att" i mappningen och rättas först
+    assert normalize_transcript_text("LÄNGT ATT vi") == "Länge ATT vi"
+
+
+def test_stt_fixes_ignorecase_oddities():
+    assert normalize_transcript_text("konfliktſutom") == "Konflikter"
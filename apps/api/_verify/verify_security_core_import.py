@@ -21,7 +21,7 @@ try:
     from security_core.privacy_shield.service import mask_text
     from security_core.privacy_shield.models import PrivacyMaskRequest, MaskedPayload
     from security_core.privacy_gate import ensure_masked_or_raise, PrivacyGateError
-    from security_core.privacy_guard import sanitize_for_logging, assert_no_content
+    from security_core.privacy_guard import sanitize_for_logging, assert_no_content, compute_integrity_hash, verify_integrity
     print("   ✓ All imports successful")
 except ImportError as e:
     print(f"   ❌ Import failed: {e}")
@@ -125,6 +125,14 @@ try:
     assert_no_content({"request_id": "123", "count": 5}, context="test")
     print("   ✓ assert_no_content correctly passes for safe data")
     
+    # Test verify_integrity (False, never an exception, on mismatch)
+    integrity_hash = compute_integrity_hash("integritet")
+    assert verify_integrity("integritet", integrity_hash), "Matching hash rejected"
+    assert not verify_integrity("integritet", integrity_hash[:-1]), "Wrong-length hash accepted"
+    assert not verify_integrity("integritet", integrity_hash[:-1] + "å"), "Non-ASCII hash accepted"
+    assert not verify_integrity("integritet", "\udcff"), "Lone surrogate hash accepted"
+    print("   ✓ verify_integrity returns False for wrong-length and non-ASCII hashes")
+    
 except Exception as e:
     print(f"   ❌ Privacy Guard failed: {e}")
     import traceback
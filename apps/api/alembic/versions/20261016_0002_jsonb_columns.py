@@ -0,0 +1,57 @@
+"""Convert JSON columns to JSONB
+
+Revision ID: 20261016_0002
+Revises: 20260108_0001
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261016_0002"
+down_revision = "20260108_0001"
+branch_labels = None
+depends_on = None
+
+# (table, column) – kolumnnamn i DB (Document.document_metadata/ProjectEvent.event_metadata heter "metadata")
+JSON_COLUMNS = [
+    ("projects", "tags"),
+    ("project_events", "metadata"),
+    ("documents", "usage_restrictions"),
+    ("documents", "pii_gate_reasons"),
+    ("documents", "metadata"),
+    ("project_notes", "pii_gate_reasons"),
+    ("project_notes", "usage_restrictions"),
+    ("knox_reports", "input_manifest"),
+    ("knox_reports", "gate_results"),
+    ("ai_jobs", "payload"),
+    ("ai_jobs", "result"),
+]
+
+
+def _column_type(conn, table: str, column: str):
+    res = conn.execute(
+        sa.text("SELECT data_type FROM information_schema.columns WHERE table_name = :t AND column_name = :c"),
+        {"t": table, "c": column},
+    ).fetchone()
+    return res[0] if res else None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+
+    for table, column in JSON_COLUMNS:
+        if _column_type(conn, table, column) == "json":
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE jsonb USING "{column}"::jsonb')
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+
+    for table, column in JSON_COLUMNS:
+        if _column_type(conn, table, column) == "jsonb":
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE json USING "{column}"::json')
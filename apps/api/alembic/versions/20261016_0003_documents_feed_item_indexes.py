@@ -0,0 +1,29 @@
+"""Expression indexes for feed item dedup on documents.metadata
+
+Revision ID: 20261016_0003
+Revises: 20261016_0002
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+
+revision = "20261016_0003"
+down_revision = "20261016_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_documents_project_item_guid ON documents (project_id, (metadata ->> 'item_guid'))")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_documents_project_item_link ON documents (project_id, (metadata ->> 'item_link'))")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_documents_project_item_link")
+    op.execute("DROP INDEX IF EXISTS ix_documents_project_item_guid")
@@ -0,0 +1,31 @@
+"""Composite (project_id, timestamp) indexes for per-project list queries
+
+Revision ID: 20261016_0004
+Revises: 20261016_0003
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+
+revision = "20261016_0004"
+down_revision = "20261016_0003"
+branch_labels = None
+depends_on = None
+
+# (index, table, columns)
+INDEXES = [
+    ("ix_documents_project_created", "documents", "project_id, created_at"),
+    ("ix_project_notes_project_created", "project_notes", "project_id, created_at"),
+    ("ix_journalist_notes_project_updated", "journalist_notes", "project_id, updated_at"),
+    ("ix_project_sources_project_created", "project_sources", "project_id, created_at"),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def downgrade() -> None:
+    for name, _table, _columns in reversed(INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
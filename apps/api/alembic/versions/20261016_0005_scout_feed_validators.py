@@ -0,0 +1,30 @@
+"""Add etag/last_modified to scout_feeds (conditional GET)
+
+Revision ID: 20261016_0005
+Revises: 20261016_0004
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261016_0005"
+down_revision = "20261016_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("scout_feeds")}
+    if "etag" not in columns:
+        op.add_column("scout_feeds", sa.Column("etag", sa.String(), nullable=True))
+    if "last_modified" not in columns:
+        op.add_column("scout_feeds", sa.Column("last_modified", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("scout_feeds")}
+    if "last_modified" in columns:
+        op.drop_column("scout_feeds", "last_modified")
+    if "etag" in columns:
+        op.drop_column("scout_feeds", "etag")
@@ -0,0 +1,69 @@
+"""Store enum columns as VARCHAR + CHECK instead of Postgres ENUM types
+
+Revision ID: 20261016_0006
+Revises: 20261016_0005
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261016_0006"
+down_revision = "20261016_0005"
+branch_labels = None
+depends_on = None
+
+# (table, column, enum/constraint name, allowed values) – värdena är enum-namnen, som SQLAlchemy lagrar
+ENUM_COLUMNS = [
+    ("projects", "classification", "classification", ["NORMAL", "SENSITIVE", "SOURCE_SENSITIVE"]),
+    ("projects", "status", "projectstatus", ["RESEARCH", "PROCESSING", "FACT_CHECK", "READY", "ARCHIVED"]),
+    ("documents", "classification", "classification", ["NORMAL", "SENSITIVE", "SOURCE_SENSITIVE"]),
+    ("documents", "sanitize_level", "sanitizelevel", ["NORMAL", "STRICT", "PARANOID"]),
+    ("project_notes", "sanitize_level", "sanitizelevel", ["NORMAL", "STRICT", "PARANOID"]),
+    ("journalist_notes", "category", "notecategory", ["RAW", "WORK", "REFLECTION", "QUESTION", "SOURCE", "OTHER"]),
+    ("project_sources", "type", "sourcetype", ["LINK", "PERSON", "DOCUMENT", "OTHER"]),
+    ("ai_jobs", "status", "aijobstatus", ["QUEUED", "RUNNING", "SUCCEEDED", "FAILED"]),
+]
+
+
+def _data_type(conn, table: str, column: str):
+    res = conn.execute(
+        sa.text("SELECT data_type FROM information_schema.columns WHERE table_name = :t AND column_name = :c"),
+        {"t": table, "c": column},
+    ).fetchone()
+    return res[0] if res else None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+
+    for table, column, name, values in ENUM_COLUMNS:
+        if _data_type(conn, table, column) != "USER-DEFINED":
+            continue
+        allowed = ", ".join(f"'{v}'" for v in values)
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" DROP DEFAULT')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE VARCHAR(32) USING "{column}"::text')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ("{column}" IN ({allowed}))')
+
+    for name in sorted({name for _t, _c, name, _v in ENUM_COLUMNS}):
+        op.execute(f"DROP TYPE IF EXISTS {name}")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+
+    types = {}
+    for _table, _column, name, values in ENUM_COLUMNS:
+        types[name] = values
+    for name, values in types.items():
+        sa.Enum(*values, name=name).create(conn, checkfirst=True)
+
+    for table, column, name, _values in ENUM_COLUMNS:
+        if _data_type(conn, table, column) != "character varying":
+            continue
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE {name} USING "{column}"::{name}')
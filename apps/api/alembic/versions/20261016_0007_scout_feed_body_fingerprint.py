@@ -0,0 +1,30 @@
+"""Add content_length/body_prefix_hash to scout_feeds
+
+Revision ID: 20261016_0007
+Revises: 20261016_0006
+Create Date: 2026-10-16
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261016_0007"
+down_revision = "20261016_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("scout_feeds")}
+    if "content_length" not in columns:
+        op.add_column("scout_feeds", sa.Column("content_length", sa.Integer(), nullable=True))
+    if "body_prefix_hash" not in columns:
+        op.add_column("scout_feeds", sa.Column("body_prefix_hash", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("scout_feeds")}
+    if "body_prefix_hash" in columns:
+        op.drop_column("scout_feeds", "body_prefix_hash")
+    if "content_length" in columns:
+        op.drop_column("scout_feeds", "content_length")
@@ -93,3 +93,46 @@ BEGIN
     END IF;
 END $$;
 
+
+-- Convert legacy JSON columns (created by create_all) to JSONB (idempotent)
+DO $$
+DECLARE
+    col RECORD;
+BEGIN
+    FOR col IN
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE data_type = 'json'
+          AND (table_name, column_name) IN (
+              ('projects', 'tags'),
+              ('project_events', 'metadata'),
+              ('documents', 'usage_restrictions'),
+              ('documents', 'pii_gate_reasons'),
+              ('documents', 'metadata'),
+              ('project_notes', 'pii_gate_reasons'),
+              ('project_notes', 'usage_restrictions'),
+              ('knox_reports', 'input_manifest'),
+              ('knox_reports', 'gate_results'),
+              ('ai_jobs', 'payload'),
+              ('ai_jobs', 'result')
+          )
+    LOOP
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE jsonb USING %I::jsonb',
+                       col.table_name, col.column_name, col.column_name);
+    END LOOP;
+END $$;
+
+-- Feed item dedup lookups (import_feed_to_project) use metadata->>'item_guid' / 'item_link'
+CREATE INDEX IF NOT EXISTS ix_documents_project_item_guid ON documents (project_id, (metadata ->> 'item_guid'));
+CREATE INDEX IF NOT EXISTS ix_documents_project_item_link ON documents (project_id, (metadata ->> 'item_link'));
+
+-- Per-project list queries: WHERE project_id = ? ORDER BY created_at/updated_at
+CREATE INDEX IF NOT EXISTS ix_documents_project_created ON documents (project_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_project_notes_project_created ON project_notes (project_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_journalist_notes_project_updated ON journalist_notes (project_id, updated_at);
+CREATE INDEX IF NOT EXISTS ix_project_sources_project_created ON project_sources (project_id, created_at);
+
+-- Conditional GET validators / change fingerprint for Scout feeds (idempotent)
+ALTER TABLE scout_feeds ADD COLUMN IF NOT EXISTS etag VARCHAR;
+ALTER TABLE scout_feeds ADD COLUMN IF NOT EXISTS last_modified VARCHAR;
+ALTER TABLE scout_feeds ADD COLUMN IF NOT EXISTS content_length INTEGER;
+ALTER TABLE scout_feeds ADD COLUMN IF NOT EXISTS body_prefix_hash VARCHAR;
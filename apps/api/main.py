@@ -3,9 +3,9 @@ from pydantic import BaseModel
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload, load_only
 from sqlalchemy.sql import func
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, select, bindparam, literal_column
 import os
 import uuid
 import shutil
@@ -73,6 +73,11 @@ from schemas import (
     KnoxCompileRequest,
     KnoxReportResponse,
     KnoxErrorResponse,
+    ProjectListAdapter,
+    DocumentListAdapter,
+    NoteListAdapter,
+    ProjectSourceListAdapter,
+    ScoutItemListAdapter,
 )
 from text_processing import (
     extract_text_from_pdf,
@@ -399,12 +404,18 @@ async def preload_stt_engine():
         logger.info("[STARTUP] STT preload disabled (set PRELOAD_STT=1 to enable).")
         return
     try:
-        from text_processing import _get_stt_engine
+        from text_processing import warmup_stt, _get_stt_engine
         logger.info("[STARTUP] Preloading STT engine...")
         engine, model, engine_name, model_name = _get_stt_engine()
         logger.info(f"[STARTUP] STT engine preloaded successfully: {engine_name}, model: {model_name}")
     except Exception as e:
         logger.warning(f"[STARTUP] Failed to preload STT engine: {str(e)} (will load on first use)")
+        return
+    try:
+        # Dummy-transkribering så att första riktiga requesten är varm (motorn är redan cachad)
+        warmup_stt()
+    except Exception as e:
+        logger.warning(f"[STARTUP] STT warmup transcription failed: {str(e)} (engine is loaded; first request runs cold)")
 
 # CORS middleware
 # - Dev: localhost
@@ -614,7 +625,7 @@ async def list_projects(
 ):
     """List all projects"""
     projects = db.query(Project).order_by(Project.updated_at.desc()).all()
-    return projects
+    return ProjectListAdapter.validate_python(projects, from_attributes=True)
 
 
 @app.post("/api/projects", response_model=ProjectResponse, status_code=201)
@@ -803,7 +814,12 @@ async def delete_project(
     # Note: Recordings are stored as documents with file_path, already counted above
     
     # 3. Journalist note images
-    journalist_notes = db.query(JournalistNote).filter(JournalistNote.project_id == project_id).all()
+    journalist_notes = (
+        db.query(JournalistNote)
+        .options(selectinload(JournalistNote.images))
+        .filter(JournalistNote.project_id == project_id)
+        .all()
+    )
     for note in journalist_notes:
         for image in note.images:
             if image.file_path:
@@ -1080,24 +1096,24 @@ async def list_documents(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    documents = db.query(Document).filter(
+    # load_only: masked_text (och file_path) ska aldrig lämna Postgres för en listning
+    documents = db.query(Document).options(
+        load_only(
+            Document.id,
+            Document.project_id,
+            Document.filename,
+            Document.file_type,
+            Document.classification,
+            Document.sanitize_level,
+            Document.usage_restrictions,
+            Document.pii_gate_reasons,
+            Document.created_at,
+        )
+    ).filter(
         Document.project_id == project_id
     ).order_by(Document.created_at.desc()).all()
     
-    return [
-        DocumentListResponse(
-            id=doc.id,
-            project_id=doc.project_id,
-            filename=doc.filename,
-            file_type=doc.file_type,
-            classification=doc.classification.value,
-            sanitize_level=doc.sanitize_level.value,
-            usage_restrictions=doc.usage_restrictions,
-            pii_gate_reasons=doc.pii_gate_reasons,
-            created_at=doc.created_at
-        )
-        for doc in documents
-    ]
+    return DocumentListAdapter.validate_python(documents, from_attributes=True)
 
 
 @app.get("/api/documents/{document_id}", response_model=DocumentResponse)
@@ -1706,8 +1722,10 @@ async def list_project_notes(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    notes = db.query(ProjectNote).filter(ProjectNote.project_id == project_id).order_by(ProjectNote.created_at.desc()).all()
-    return notes
+    notes = db.query(ProjectNote).options(
+        load_only(ProjectNote.id, ProjectNote.project_id, ProjectNote.title, ProjectNote.sanitize_level, ProjectNote.created_at)
+    ).filter(ProjectNote.project_id == project_id).order_by(ProjectNote.created_at.desc()).all()
+    return NoteListAdapter.validate_python(notes, from_attributes=True)
 
 
 @app.post("/api/projects/{project_id}/notes", response_model=NoteResponse, status_code=201)
@@ -1993,7 +2011,18 @@ async def list_journalist_notes(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    notes = db.query(JournalistNote).filter(JournalistNote.project_id == project_id).order_by(JournalistNote.updated_at.desc()).all()
+    # Första raden av body (max 101 tecken, räcker för att avgöra "...") räknas ut i Postgres,
+    # så hela body aldrig skickas över för en listning.
+    first_line = func.substr(func.split_part(JournalistNote.body, '\n', 1), 1, 101).label("first_line")
+    notes = db.query(
+        JournalistNote.id,
+        JournalistNote.project_id,
+        JournalistNote.title,
+        JournalistNote.category,
+        JournalistNote.created_at,
+        JournalistNote.updated_at,
+        first_line,
+    ).filter(JournalistNote.project_id == project_id).order_by(JournalistNote.updated_at.desc()).all()
     
     # Build list response with preview (title or first line of body)
     result = []
@@ -2002,7 +2031,7 @@ async def list_journalist_notes(
         if note.title:
             preview = note.title
         else:
-            preview = note.body.split('\n')[0] if note.body else ""
+            preview = note.first_line or ""
             if len(preview) > 100:
                 preview = preview[:100] + "..."
         
@@ -2508,7 +2537,7 @@ async def get_project_sources(
         raise HTTPException(status_code=404, detail="Project not found")
     
     sources = db.query(ProjectSource).filter(ProjectSource.project_id == project_id).order_by(ProjectSource.created_at.desc()).all()
-    return sources
+    return ProjectSourceListAdapter.validate_python(sources, from_attributes=True)
 
 @app.put("/api/projects/{project_id}/sources/{source_id}", response_model=ProjectSourceResponse)
 async def update_project_source(
@@ -2717,6 +2746,12 @@ async def update_scout_feed(
     if body.name is not None:
         feed.name = body.name
     if body.url is not None:
+        if body.url != feed.url:
+            # Validators hör till den gamla URL:en
+            feed.etag = None
+            feed.last_modified = None
+            feed.content_length = None
+            feed.body_prefix_hash = None
         feed.url = body.url
     if body.is_enabled is not None:
         feed.is_enabled = body.is_enabled
@@ -2751,7 +2786,7 @@ async def list_scout_items(
         sql_func.coalesce(ScoutItem.published_at, ScoutItem.fetched_at).desc()
     ).limit(limit).all()
     
-    return items
+    return ScoutItemListAdapter.validate_python(items, from_attributes=True)
 
 
 @app.post("/api/scout/fetch")
@@ -2922,6 +2957,19 @@ async def preview_feed(
         raise HTTPException(status_code=500, detail=f"Failed to preview feed: {str(e)}")
 
 
+# Feed-dedup per item: byggs en gång (bindparams -> samma cache-nyckel och samma plan för varje anrop).
+# Hämtar bara id; masked_text behövs inte för en existens-check. Nyckeln renderas som literal
+# (inte bind-param) så att uttrycket är exakt (metadata ->> 'item_guid') = uttrycksindexet.
+_FEED_DOC_BY_GUID_STMT = select(Document.id).where(
+    Document.project_id == bindparam("project_id"),
+    Document.document_metadata[literal_column("'item_guid'")].astext == bindparam("value"),
+).limit(1)
+_FEED_DOC_BY_LINK_STMT = select(Document.id).where(
+    Document.project_id == bindparam("project_id"),
+    Document.document_metadata[literal_column("'item_link'")].astext == bindparam("value"),
+).limit(1)
+
+
 @app.post("/api/projects/from-feed", response_model=CreateProjectFromFeedResponse, status_code=201)
 async def create_project_from_feed(
     request: CreateProjectFromFeedRequest,
@@ -2997,21 +3045,16 @@ async def create_project_from_feed(
             # Dedupe: check if document with same guid or link already exists in project
             existing_doc = None
             if item_guid:
-                # Check by guid first (PostgreSQL JSONB query)
-                from sqlalchemy import func
-                existing_doc = db.query(Document).filter(
-                    Document.project_id == db_project.id,
-                    Document.document_metadata.isnot(None),
-                    func.jsonb_extract_path_text(Document.document_metadata, 'item_guid') == item_guid
-                ).first()
+                # Check by guid first (->> matchar uttrycksindexet ix_documents_project_item_guid)
+                existing_doc = db.execute(
+                    _FEED_DOC_BY_GUID_STMT, {"project_id": db_project.id, "value": item_guid}
+                ).scalar_one_or_none()
             
             if not existing_doc and item_link:
-                # Check by link if guid didn't match
-                existing_doc = db.query(Document).filter(
-                    Document.project_id == db_project.id,
-                    Document.document_metadata.isnot(None),
-                    func.jsonb_extract_path_text(Document.document_metadata, 'item_link') == item_link
-                ).first()
+                # Check by link if guid didn't match (ix_documents_project_item_link)
+                existing_doc = db.execute(
+                    _FEED_DOC_BY_LINK_STMT, {"project_id": db_project.id, "value": item_link}
+                ).scalar_one_or_none()
             
             if existing_doc:
                 skipped_duplicates += 1
@@ -1,10 +1,22 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Enum as SQLEnum, Text, Boolean, Index
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Boolean, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from database import Base
 
 
+def _str_enum(enum_cls):
+    """
+    Enum-kolumn lagrad som VARCHAR + CHECK i stället för Postgres ENUM-typ.
+    
+    Python-sidan får fortfarande enum-medlemmar (.value fungerar som förut), men DB:n slipper
+    pg_type-lookups och nya värden kräver inte ALTER TYPE ... ADD VALUE (icke-transaktionellt).
+    Lagrar enum-namnen (NORMAL, ...) precis som den tidigare native-typen.
+    """
+    return SQLEnum(enum_cls, native_enum=False, create_constraint=True, length=32)
+
+
 class Classification(str, enum.Enum):
     NORMAL = "normal"
     SENSITIVE = "sensitive"
@@ -38,18 +50,23 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    classification = Column(SQLEnum(Classification), default=Classification.NORMAL, nullable=False)
-    status = Column(SQLEnum(ProjectStatus), default=ProjectStatus.RESEARCH, nullable=False)
+    classification = Column(_str_enum(Classification), default=Classification.NORMAL, nullable=False)
+    status = Column(_str_enum(ProjectStatus), default=ProjectStatus.RESEARCH, nullable=False)
     due_date = Column(DateTime(timezone=True), nullable=True)
-    tags = Column(JSON, nullable=True)  # List of strings
+    tags = Column(JSONB, nullable=True)  # List of strings
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    events = relationship("ProjectEvent", back_populates="project", order_by="ProjectEvent.timestamp.desc()")
-    documents = relationship("Document", back_populates="project", order_by="Document.created_at.desc()")
-    notes = relationship("ProjectNote", back_populates="project", order_by="ProjectNote.created_at.desc()")
-    journalist_notes = relationship("JournalistNote", back_populates="project", order_by="JournalistNote.updated_at.desc()")
-    sources = relationship("ProjectSource", back_populates="project", order_by="ProjectSource.created_at.desc()")
+    # lazy="raise": samlingarna serialiseras aldrig via ProjectResponse. Den som behöver dem
+    # måste välja selectinload() explicit, så att list-endpoints inte glider in i N+1.
+    # passive_deletes=True: FK har ON DELETE CASCADE, ORM ska inte ladda barnen vid delete.
+    events = relationship("ProjectEvent", back_populates="project", order_by="ProjectEvent.timestamp.desc()", lazy="raise", passive_deletes=True)
+    documents = relationship("Document", back_populates="project", order_by="Document.created_at.desc()", lazy="raise", passive_deletes=True)
+    notes = relationship("ProjectNote", back_populates="project", order_by="ProjectNote.created_at.desc()", lazy="raise", passive_deletes=True)
+    journalist_notes = relationship(
+        "JournalistNote", back_populates="project", order_by="JournalistNote.updated_at.desc()", lazy="raise", passive_deletes=True
+    )
+    sources = relationship("ProjectSource", back_populates="project", order_by="ProjectSource.created_at.desc()", lazy="raise", passive_deletes=True)
 
 
 class ProjectEvent(Base):
@@ -60,7 +77,7 @@ class ProjectEvent(Base):
     event_type = Column(String, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     actor = Column(String, nullable=True)
-    event_metadata = Column("metadata", JSON, nullable=True)
+    event_metadata = Column("metadata", JSONB, nullable=True)
 
     project = relationship("Project", back_populates="events")
 
@@ -72,17 +89,27 @@ class Document(Base):
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     filename = Column(String, nullable=False)
     file_type = Column(String, nullable=False)  # 'pdf' or 'txt'
-    classification = Column(SQLEnum(Classification), nullable=False)
+    classification = Column(_str_enum(Classification), nullable=False)
     masked_text = Column(Text, nullable=False)
     file_path = Column(String, nullable=False)  # Server-side only, never exposed
-    sanitize_level = Column(SQLEnum(SanitizeLevel), default=SanitizeLevel.NORMAL, nullable=False)
-    usage_restrictions = Column(JSON, nullable=False, default=lambda: {"ai_allowed": True, "export_allowed": True})
-    pii_gate_reasons = Column(JSON, nullable=True)  # {"normal": [...], "strict": [...]}
-    document_metadata = Column("metadata", JSON, nullable=True)  # {"source_type": "feed", "feed_url": "...", "item_guid": "...", "item_link": "...", "published": "..."}
+    sanitize_level = Column(_str_enum(SanitizeLevel), default=SanitizeLevel.NORMAL, nullable=False)
+    usage_restrictions = Column(JSONB, nullable=False, default=lambda: {"ai_allowed": True, "export_allowed": True})
+    pii_gate_reasons = Column(JSONB, nullable=True)  # {"normal": [...], "strict": [...]}
+    document_metadata = Column("metadata", JSONB, nullable=True)  # {"source_type": "feed", "feed_url": "...", "item_guid": "...", "item_link": "...", "published": "..."}
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     project = relationship("Project", back_populates="documents")
 
+    # (project_id, created_at): listningar per projekt sorterar på created_at (båda riktningar,
+    # Postgres kan skanna btree baklänges) - ingen separat sort-nod.
+    # Uttrycksindex för feed-dedup (import_feed_to_project). Postgres matchar exakt uttryck,
+    # så lookups måste rendera (metadata ->> 'item_guid') med nyckeln som literal (se main.py).
+    __table_args__ = (
+        Index('ix_documents_project_created', 'project_id', 'created_at'),
+        Index('ix_documents_project_item_guid', 'project_id', text("(metadata ->> 'item_guid')")),
+        Index('ix_documents_project_item_link', 'project_id', text("(metadata ->> 'item_link')")),
+    )
+
 
 class ProjectNote(Base):
     """Project notes with same sanitization as documents."""
@@ -92,13 +119,17 @@ class ProjectNote(Base):
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=True)  # Optional title
     masked_body = Column(Text, nullable=False)  # Masked/sanitized body text
-    sanitize_level = Column(SQLEnum(SanitizeLevel), default=SanitizeLevel.NORMAL, nullable=False)
-    pii_gate_reasons = Column(JSON, nullable=True)
-    usage_restrictions = Column(JSON, nullable=True)  # Same as Document: {"ai_allowed": bool, "export_allowed": bool}
+    sanitize_level = Column(_str_enum(SanitizeLevel), default=SanitizeLevel.NORMAL, nullable=False)
+    pii_gate_reasons = Column(JSONB, nullable=True)
+    usage_restrictions = Column(JSONB, nullable=True)  # Same as Document: {"ai_allowed": bool, "export_allowed": bool}
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     project = relationship("Project", back_populates="notes")
 
+    __table_args__ = (
+        Index('ix_project_notes_project_created', 'project_id', 'created_at'),
+    )
+
 
 class NoteCategory(str, enum.Enum):
     RAW = "raw"  # Råanteckning
@@ -117,13 +148,17 @@ class JournalistNote(Base):
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=True)  # Optional title/name for the note
     body = Column(Text, nullable=False)  # Raw text - only technical sanitization (no masking, no normalization)
-    category = Column(SQLEnum(NoteCategory), default=NoteCategory.RAW, nullable=False)
+    category = Column(_str_enum(NoteCategory), default=NoteCategory.RAW, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     project = relationship("Project", back_populates="journalist_notes")
     images = relationship("JournalistNoteImage", back_populates="note", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_journalist_notes_project_updated', 'project_id', 'updated_at'),
+    )
+
 
 class JournalistNoteImage(Base):
     """Images attached to journalist notes - private references only."""
@@ -146,13 +181,17 @@ class ProjectSource(Base):
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)  # Kort, manuell titel
-    type = Column(SQLEnum(SourceType), nullable=False)
+    type = Column(_str_enum(SourceType), nullable=False)
     url = Column(String, nullable=True)  # URL för länk-källor (first-class field)
     comment = Column(String, nullable=True)  # Valfri, kort kommentar
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     project = relationship("Project", back_populates="sources")
 
+    __table_args__ = (
+        Index('ix_project_sources_project_created', 'project_id', 'created_at'),
+    )
+
 
 class ScoutFeed(Base):
     """RSS feeds för Scout-funktionalitet."""
@@ -162,6 +201,10 @@ class ScoutFeed(Base):
     name = Column(String, nullable=False)
     url = Column(String, nullable=False)  # Kan vara placeholder/tom
     is_enabled = Column(Boolean, default=True, nullable=False)
+    etag = Column(String, nullable=True)  # Senaste ETag (conditional GET)
+    last_modified = Column(String, nullable=True)  # Senaste Last-Modified (conditional GET)
+    content_length = Column(Integer, nullable=True)  # Senaste Content-Length (oförändrat-koll utan validators)
+    body_prefix_hash = Column(String, nullable=True)  # sha256 av bodyns första BODY_PREFIX_BYTES
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -191,8 +234,8 @@ class KnoxReport(Base):
     template_id = Column(String, nullable=False)  # e.g., "weekly", "brief", "incident"
     engine_id = Column(String, nullable=True)  # e.g., "ministral-3-8b-gguf-q4_k_m"
     input_fingerprint = Column(String, nullable=False)  # sha256 of canonical manifest
-    input_manifest = Column(JSON, nullable=False)  # Manifest utan innehåll
-    gate_results = Column(JSON, nullable=False)  # {"input": {"pass": bool, "reasons": []}, "output": {...}}
+    input_manifest = Column(JSONB, nullable=False)  # Manifest utan innehåll
+    gate_results = Column(JSONB, nullable=False)  # {"input": {"pass": bool, "reasons": []}, "output": {...}}
     rendered_markdown = Column(Text, nullable=True)  # Endast vid pass, null vid fail
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     latency_ms = Column(Integer, nullable=True)  # Latency i millisekunder
@@ -216,14 +259,14 @@ class AiJob(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     kind = Column(String, nullable=False)  # e.g. "fortknox_compile", "recording_transcribe"
-    status = Column(SQLEnum(AiJobStatus), default=AiJobStatus.QUEUED, nullable=False)
+    status = Column(_str_enum(AiJobStatus), default=AiJobStatus.QUEUED, nullable=False)
     progress = Column(Integer, default=0, nullable=False)  # 0..100 (best effort)
 
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
     actor = Column(String, nullable=True)
 
-    payload = Column(JSON, nullable=True)  # metadata-only request payload
-    result = Column(JSON, nullable=True)   # metadata-only result payload (ids, timings)
+    payload = Column(JSONB, nullable=True)  # metadata-only request payload
+    result = Column(JSONB, nullable=True)   # metadata-only result payload (ids, timings)
 
     error_code = Column(String, nullable=True)
     error_detail = Column(String, nullable=True)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 from models import Classification, NoteCategory, SourceType, ProjectStatus
@@ -426,3 +426,12 @@ class KnoxReportResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# List adapters: validerar en hel lista ORM-rader i ett pydantic-core-anrop (from_attributes)
+# i stället för en modell-konstruktion per rad. Byggs en gång vid import.
+ProjectListAdapter = TypeAdapter(List[ProjectResponse])
+DocumentListAdapter = TypeAdapter(List[DocumentListResponse])
+NoteListAdapter = TypeAdapter(List[NoteListResponse])
+ProjectSourceListAdapter = TypeAdapter(List[ProjectSourceResponse])
+ScoutItemListAdapter = TypeAdapter(List[ScoutItemResponse])
@@ -1,15 +1,21 @@
 """
 Scout RSS feed fetching logic.
 """
+import calendar
 import hashlib
+import io
 import logging
-import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import List, Dict, Optional
+from typing import List, Dict
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
 
 from models import ScoutFeed, ScoutItem
 
@@ -18,14 +24,106 @@ logger = logging.getLogger(__name__)
 # User-Agent for RSS requests
 USER_AGENT = "Scout/1.0 (journalist workspace)"
 REQUEST_TIMEOUT = 10  # seconds
+BODY_PREFIX_BYTES = 4096  # Hashas för "oförändrat"-kollen (kanal-header + första items)
 
+# Delad HTTP-session: keep-alive + connection pool, så flera flöden från samma värd
+# (t.ex. polisen.se) återanvänder TCP/TLS-anslutningen i stället för nytt handslag per feed.
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': USER_AGENT})
+SESSION.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+SESSION.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
 
-def calculate_guid_hash(feed_url: str, entry: Dict) -> str:
+# Max antal guid_hashes som hålls i minnet (~10 MB)
+SEEN_CACHE_SIZE = 100_000
+
+
+class SeenHashes:
+    """
+    Bounded LRU set of guid_hashes known to exist in scout_items.
+    
+    Lets steady-state polls skip items that were already stored without touching the DB.
+    Only an optimization: ON CONFLICT DO NOTHING on guid_hash is still the source of truth.
+    """
+    
+    def __init__(self, maxsize: int = SEEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._hashes: "OrderedDict[str, None]" = OrderedDict()
+    
+    def __contains__(self, guid_hash: str) -> bool:
+        if guid_hash in self._hashes:
+            self._hashes.move_to_end(guid_hash)
+            return True
+        return False
+    
+    def __len__(self) -> int:
+        return len(self._hashes)
+    
+    def add(self, guid_hash: str) -> None:
+        self._hashes[guid_hash] = None
+        self._hashes.move_to_end(guid_hash)
+        if len(self._hashes) > self.maxsize:
+            self._hashes.popitem(last=False)
+
+
+class _PrefixedStream(io.RawIOBase):
+    """
+    Read-only stream: bytes already read from a response, then the rest of response.raw.
+    
+    Lets feedparser read the body without concatenating the prefix and the remainder.
+    """
+    
+    def __init__(self, prefix: bytes, raw):
+        self._prefix = memoryview(prefix)
+        self._raw = raw
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            count = min(len(buffer), len(self._prefix))
+            buffer[:count] = self._prefix[:count]
+            self._prefix = self._prefix[count:]
+            return count
+        return self._raw.readinto(buffer)
+
+
+_SEEN = SeenHashes()
+_seen_warmed = False
+
+# Statements byggs en gång vid import; parametrar via bindparam så att SQLAlchemys
+# compiled cache och serverns plan återanvänds oavsett värden/listlängd.
+_RECENT_HASHES_STMT = select(ScoutItem.guid_hash).order_by(ScoutItem.id.desc()).limit(bindparam("limit"))
+_EXISTING_HASHES_STMT = select(ScoutItem.guid_hash).where(ScoutItem.guid_hash.in_(bindparam("hashes", expanding=True)))
+
+
+def _warm_seen_hashes(db: Session) -> None:
+    """Fill _SEEN with the most recent guid_hashes once per process."""
+    global _seen_warmed
+    if _seen_warmed:
+        return
+    recent = db.execute(_RECENT_HASHES_STMT, {"limit": _SEEN.maxsize}).scalars().all()
+    # Äldst först så att de senaste hamnar sist i LRU-ordningen
+    for guid_hash in reversed(recent):
+        _SEEN.add(guid_hash)
+    _seen_warmed = True
+
+
+def _hash_stable_id(feed_url_bytes: bytes, stable_id: str) -> str:
+    """SHA256(feed_url + stable_id) as hex. Dedup, not security (usedforsecurity=False)."""
+    # Algoritmen ligger kvar på SHA256 så befintliga guid_hash-rader matchar.
+    h = hashlib.sha256(usedforsecurity=False)
+    h.update(feed_url_bytes)
+    h.update(stable_id.encode('utf-8'))
+    return h.hexdigest()
+
+
+def calculate_guid_hash(feed_url_bytes: bytes, entry: Dict) -> str:
     """
     Calculate unique hash for RSS item deduplication.
     
     Args:
-        feed_url: URL of the feed
+        feed_url_bytes: UTF-8 encoded URL of the feed (encode once per feed, not per entry)
         entry: Dictionary with entry data (id, link, title, published, updated)
         
     Returns:
@@ -36,45 +134,47 @@ def calculate_guid_hash(feed_url: str, entry: Dict) -> str:
         entry.get('link') or 
         (entry.get('title', '') + str(entry.get('published') or entry.get('updated') or ''))
     )
-    hash_input = f"{feed_url}{stable_id}"
-    return hashlib.sha256(hash_input.encode('utf-8')).hexdigest()
+    return _hash_stable_id(feed_url_bytes, stable_id)
 
 
-def parse_rss_feed(url: str, content: Optional[bytes] = None) -> List[Dict]:
+def insert_new_items(db: Session, rows: List[Dict]) -> int:
     """
-    Parse RSS/Atom feed using feedparser.
+    Insert Scout items in a single round-trip and let the guid_hash unique index drop duplicates.
     
     Args:
-        url: Feed URL
+        db: Database session
+        rows: Column dictionaries for ScoutItem (unique on guid_hash within the batch)
         
     Returns:
-        List of entry dictionaries with keys: title, link, published_parsed, updated_parsed, id
+        Number of rows actually inserted
     """
-    entries = []
+    if not rows:
+        return 0
     
-    try:
-        # Parse från redan hämtad respons om möjligt (undvik dubbel-fetch utan headers)
-        feed = feedparser.parse(content if content is not None else url)
-        
-        for entry in feed.entries:
-            entries.append({
-                'title': getattr(entry, 'title', ''),
-                'link': getattr(entry, 'link', ''),
-                'published_parsed': getattr(entry, 'published_parsed', None),
-                'updated_parsed': getattr(entry, 'updated_parsed', None),
-                'id': getattr(entry, 'id', getattr(entry, 'link', ''))
-            })
-    except Exception as e:
-        logger.warning(f"Failed to parse feed {url}: {e}")
-        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = pg_insert(ScoutItem)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(ScoutItem)
+    else:
+        # Fallback: en SELECT för hela batchen i stället för en per item
+        hashes = [row['guid_hash'] for row in rows]
+        existing = set(db.execute(_EXISTING_HASHES_STMT, {"hashes": hashes}).scalars())
+        new_rows = [row for row in rows if row['guid_hash'] not in existing]
+        db.add_all(ScoutItem(**row) for row in new_rows)
+        return len(new_rows)
     
-    return entries
+    stmt = stmt.values(rows).on_conflict_do_nothing(index_elements=['guid_hash']).returning(ScoutItem.id)
+    return len(db.execute(stmt).scalars().all())
 
 
 def fetch_all_feeds(db: Session) -> Dict[int, int]:
     """
     Fetch all enabled feeds and save new items.
     
+    All feeds are written in one transaction (one commit/fsync for the whole fan-out).
+    Each feed's writes run in a SAVEPOINT, so a failing feed only rolls back its own rows.
+    
     Args:
         db: Database session
         
@@ -83,6 +183,8 @@ def fetch_all_feeds(db: Session) -> Dict[int, int]:
     """
     feeds = db.query(ScoutFeed).filter(ScoutFeed.is_enabled.is_(True)).all()
     results = {}
+    committed_hashes = []
+    _warm_seen_hashes(db)
     
     for feed in feeds:
         try:
@@ -92,75 +194,124 @@ def fetch_all_feeds(db: Session) -> Dict[int, int]:
                 results[feed.id] = 0
                 continue
             
-            # Fetch feed with timeout and User-Agent
+            # Fetch feed with timeout (User-Agent sätts på SESSION).
+            # stream=True: body läses av feedparser direkt från socketen, inte via response.content.
+            response = None
             try:
-                response = requests.get(
-                    feed.url,
-                    timeout=REQUEST_TIMEOUT,
-                    headers={'User-Agent': USER_AGENT}
-                )
+                # Conditional GET: oförändrat flöde ger 304 utan body -> ingen parse/hash
+                conditional_headers = {}
+                if feed.etag:
+                    conditional_headers['If-None-Match'] = feed.etag
+                if feed.last_modified:
+                    conditional_headers['If-Modified-Since'] = feed.last_modified
+                response = SESSION.get(feed.url, timeout=REQUEST_TIMEOUT, headers=conditional_headers, stream=True)
                 response.raise_for_status()
             except requests.exceptions.RequestException as e:
+                if response is not None:
+                    response.close()
                 # Log metadata only (no content)
                 logger.error(f"Scout feed {feed.id} ({feed.name}): HTTP error - {type(e).__name__}")
-                db.rollback()
                 results[feed.id] = 0
                 continue
             
-            # Parse feed (använd response.content så vi inte gör en ny fetch i feedparser)
-            entries = parse_rss_feed(feed.url, content=response.content)
+            if response.status_code == 304:
+                response.close()
+                logger.info(f"Scout feed {feed.id} ({feed.name}): not modified")
+                results[feed.id] = 0
+                continue
+            
+            content_length_header = response.headers.get('Content-Length', '')
+            content_length = int(content_length_header) if content_length_header.isdigit() else None
+            
+            try:
+                response.raw.decode_content = True  # gzip/deflate avkodas av urllib3
+                # Billig ändringskoll för servrar utan ETag/Last-Modified-stöd:
+                # samma Content-Length + samma hash av bodyns början -> hoppa över feedparser.
+                body_prefix = response.raw.read(BODY_PREFIX_BYTES)
+                body_prefix_hash = hashlib.sha256(body_prefix, usedforsecurity=False).hexdigest()
+                unchanged = (
+                    content_length is not None
+                    and content_length == feed.content_length
+                    and body_prefix_hash == feed.body_prefix_hash
+                )
+                
+                # Parse feed från den strömmade bodyn (ingen ny fetch i feedparser, ingen response.content).
+                # Entries läses direkt från feedparser - ingen mellanliggande dict/lista per entry.
+                entries = []
+                if not unchanged:
+                    try:
+                        entries = feedparser.parse(_PrefixedStream(body_prefix, response.raw)).entries
+                    except Exception as e:
+                        logger.warning(f"Failed to parse feed {feed.url}: {e}")
+            finally:
+                response.close()
+            
+            if unchanged:
+                logger.info(f"Scout feed {feed.id} ({feed.name}): unchanged (length + prefix)")
+                results[feed.id] = 0
+                continue
             
             if not entries:
                 logger.warning(f"Scout feed {feed.id} ({feed.name}): no entries found")
                 results[feed.id] = 0
                 continue
             
-            new_count = 0
+            rows = {}
+            feed_url_bytes = feed.url.encode('utf-8')
             
             for entry in entries:
-                # Calculate dedup hash
-                guid_hash = calculate_guid_hash(feed.url, entry)
+                link = getattr(entry, 'link', '')
+                title = getattr(entry, 'title', '')
                 
-                # Check if item already exists
-                existing = db.query(ScoutItem).filter(ScoutItem.guid_hash == guid_hash).first()
-                if existing:
+                # Calculate dedup hash (samma item kan förekomma flera gånger i ett flöde).
+                # stable_id = id -> link -> title, samma som calculate_guid_hash på den tidigare entry-dicten.
+                guid_hash = _hash_stable_id(feed_url_bytes, getattr(entry, 'id', '') or link or title)
+                if guid_hash in rows or guid_hash in _SEEN:
                     continue
                 
-                # Parse published date from feedparser time tuple
+                # Parse published date from feedparser time tuple (UTC -> timegm, inte mktime/lokal tid)
                 published_at = None
-                if entry.get('published_parsed'):
+                published_parsed = getattr(entry, 'published_parsed', None)
+                if published_parsed:
                     try:
                         published_at = datetime.fromtimestamp(
-                            time.mktime(entry['published_parsed']),
+                            calendar.timegm(published_parsed),
                             tz=timezone.utc
                         )
                     except Exception:
                         pass
                 
                 # Fallback to updated_parsed if published_parsed not available
-                if not published_at and entry.get('updated_parsed'):
+                updated_parsed = getattr(entry, 'updated_parsed', None) if not published_at else None
+                if updated_parsed:
                     try:
                         published_at = datetime.fromtimestamp(
-                            time.mktime(entry['updated_parsed']),
+                            calendar.timegm(updated_parsed),
                             tz=timezone.utc
                         )
                     except Exception:
                         pass
                 
-                # Create new item
-                item = ScoutItem(
-                    feed_id=feed.id,
-                    title=entry.get('title', '')[:500],  # Limit length
-                    link=entry.get('link', '')[:1000],  # Limit length
-                    published_at=published_at,
-                    guid_hash=guid_hash,
-                    raw_source=feed.name
-                )
-                db.add(item)
-                new_count += 1
+                rows[guid_hash] = {
+                    'feed_id': feed.id,
+                    'title': title[:500],  # Limit length
+                    'link': link[:1000],  # Limit length
+                    'published_at': published_at,
+                    'guid_hash': guid_hash,
+                    'raw_source': feed.name,
+                }
+            
+            # SAVEPOINT per feed: fel här rullar bara tillbaka detta flödes rader/validators
+            with db.begin_nested():
+                feed.etag = response.headers.get('ETag')
+                feed.last_modified = response.headers.get('Last-Modified')
+                feed.content_length = content_length
+                feed.body_prefix_hash = body_prefix_hash
+                # Dedup sker i databasen (ON CONFLICT DO NOTHING på guid_hash) - ingen SELECT per item
+                new_count = insert_new_items(db, list(rows.values()))
             
-            db.commit()
             results[feed.id] = new_count
+            committed_hashes.extend(rows)
             
             # Log metadata only (no content)
             logger.info(f"Scout feed {feed.id} ({feed.name}): {new_count} nya items")
@@ -168,7 +319,17 @@ def fetch_all_feeds(db: Session) -> Dict[int, int]:
         except Exception as e:
             # Fail-closed: log error but don't crash
             logger.error(f"Scout feed {feed.id} ({feed.name}): fetch failed - {type(e).__name__}: {str(e)}")
-            db.rollback()
             results[feed.id] = 0
     
+    try:
+        db.commit()
+    except Exception as e:
+        logger.error(f"Scout fetch: commit failed - {type(e).__name__}")
+        db.rollback()
+        return {feed_id: 0 for feed_id in results}
+    
+    # Först efter commit: nu finns alla (nya eller redan befintliga) i scout_items
+    for guid_hash in committed_hashes:
+        _SEEN.add(guid_hash)
+    
     return results
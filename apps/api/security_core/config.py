@@ -1,16 +1,42 @@
 """Security Core configuration (dormant, not used in runtime)."""
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 
-# Main feature flag (dormant)
-SECURITY_CORE_ENABLED = os.getenv("SECURITY_CORE_ENABLED", "false").lower() == "true"
 
-# Control model flag (for service.py control check path)
-CONTROL_MODEL_ENABLED = os.getenv("CONTROL_MODEL_ENABLED", "false").lower() == "true"
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() == "true"
 
-# Privacy Shield settings
-privacy_max_chars = int(os.getenv("PRIVACY_MAX_CHARS", "50000"))
 
-# Privacy Guard settings
-source_safety_mode = os.getenv("SOURCE_SAFETY_MODE", "true").lower() == "true"
-debug = os.getenv("DEBUG", "false").lower() == "true"
+@dataclass(frozen=True)
+class Settings:
+    """Env-backed settings, parsed once per process (see get_settings)."""
 
+    # Main feature flag (dormant)
+    security_core_enabled: bool
+    # Control model flag (for service.py control check path)
+    control_model_enabled: bool
+    # Privacy Shield settings
+    privacy_max_chars: int
+    # Privacy Guard settings
+    source_safety_mode: bool
+    debug: bool
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        privacy_max_chars = int(os.getenv("PRIVACY_MAX_CHARS", "50000"))
+        if privacy_max_chars <= 0:
+            raise ValueError("PRIVACY_MAX_CHARS must be a positive integer")
+        return cls(
+            security_core_enabled=_env_bool("SECURITY_CORE_ENABLED", "false"),
+            control_model_enabled=_env_bool("CONTROL_MODEL_ENABLED", "false"),
+            privacy_max_chars=privacy_max_chars,
+            source_safety_mode=_env_bool("SOURCE_SAFETY_MODE", "true"),
+            debug=_env_bool("DEBUG", "false"),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return process-wide settings. Env is read on first call only (get_settings.cache_clear() to re-read)."""
+    return Settings.from_env()
@@ -6,10 +6,15 @@ No raw text can reach external APIs without passing privacy_gate.
 This is the ONLY way to prepare text for external LLM providers.
 """
 from fastapi import HTTPException
+from pydantic import TypeAdapter
 
 from .privacy_shield.service import mask_text
 from .privacy_shield.models import PrivacyMaskRequest, MaskedPayload, PrivacyMaskResponse
 
+# Byggs en gång: återanvänd validatorn i stället för modell-konstruktion per anrop
+_REQUEST_ADAPTER = TypeAdapter(PrivacyMaskRequest)
+_ALLOWED_MODES = frozenset({"strict", "balanced"})
+
 
 class PrivacyGateError(Exception):
     """Error raised when privacy gate blocks request."""
@@ -35,12 +40,12 @@ async def ensure_masked_or_raise(text: str, mode: str = "strict", request_id: st
         PrivacyGateError: If masking fails or leak detected
         HTTPException: If input validation fails
     """
+    # Ogiltigt mode avvisas innan validatorn körs (samma fel som en ValidationError gav tidigare)
+    if mode not in _ALLOWED_MODES:
+        raise PrivacyGateError("Privacy gate failed: ValidationError")
+    
     try:
-        request = PrivacyMaskRequest(
-            text=text,
-            mode=mode,
-            language="sv"
-        )
+        request = _REQUEST_ADAPTER.validate_python({"text": text, "mode": mode, "language": "sv"})
         
         # Use Privacy Shield service to mask
         response: PrivacyMaskResponse = await mask_text(request, request_id)
@@ -5,10 +5,14 @@ DEV: raises AssertionError
 PROD: drops fields + logs safe warning event.
 """
 import hashlib
+import hmac
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from typing import Any, Dict, List, Set
 
-from .config import source_safety_mode, debug
+from .config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -63,9 +67,41 @@ _FORBIDDEN_SOURCE_KEYS = frozenset({
     "hostname",
 })
 
+# Content + source keys, merged once at import (SOURCE_SAFETY_MODE=true)
+_FORBIDDEN_ALL_KEYS = _FORBIDDEN_CONTENT_KEYS | _FORBIDDEN_SOURCE_KEYS
+
 # Maximum string length in audit/log metadata (counts/ids only)
 _MAX_METADATA_STRING_LENGTH = 512
 
+# sanitize_for_logging: value kind per exact type (typical JSON-like payload types)
+_VALUE_KINDS = {
+    str: "str",
+    dict: "dict",
+    list: "list",
+    int: "scalar",
+    float: "scalar",
+    bool: "scalar",
+    type(None): "scalar",
+}
+
+# compute_integrity_hash: content longer than this is encoded/hashed in chunks
+_INTEGRITY_HASH_CHUNK_CHARS = 1 << 20
+
+# compute_integrity_hashes: batches smaller than this (total chars) are hashed inline
+_INTEGRITY_HASH_PARALLEL_MIN_CHARS = 1 << 20
+_INTEGRITY_HASH_MAX_WORKERS = 4
+
+
+def _value_kind(value: Any) -> str:
+    """Value kind for types missing from _VALUE_KINDS (subclasses such as str enums, OrderedDict)."""
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, dict):
+        return "dict"
+    if isinstance(value, list):
+        return "list"
+    return "scalar"
+
 
 def sanitize_for_logging(data: Dict[str, Any], context: str = "log") -> Dict[str, Any]:
     """Sanitize data for logging/audit (remove content and source identifiers, truncate strings).
@@ -80,53 +116,68 @@ def sanitize_for_logging(data: Dict[str, Any], context: str = "log") -> Dict[str
     Raises:
         AssertionError: In DEV mode if forbidden keys found
     """
+    settings = get_settings()
+    debug = settings.debug
     sanitized: Dict[str, Any] = {}
     violations: List[str] = []
     
-    # Combine forbidden keys (content + source protection)
-    forbidden_keys = _FORBIDDEN_CONTENT_KEYS
-    if source_safety_mode:
-        forbidden_keys = forbidden_keys | _FORBIDDEN_SOURCE_KEYS
+    # Forbidden keys (content, + source protection in SOURCE_SAFETY_MODE)
+    forbidden_keys = _FORBIDDEN_ALL_KEYS if settings.source_safety_mode else _FORBIDDEN_CONTENT_KEYS
     
-    for key, value in data.items():
-        key_lower = key.lower()
-        
-        # Check for forbidden keys (content or source identifiers)
-        if key_lower in forbidden_keys:
-            violations.append(key)
-            if debug:
-                violation_type = "source identifier" if key_lower in _FORBIDDEN_SOURCE_KEYS else "content"
-                raise AssertionError(
-                    f"Privacy violation in {context}: forbidden {violation_type} key '{key}' found. "
-                    f"Source identifiers and content are never allowed in logs/audit when SOURCE_SAFETY_MODE is enabled."
-                )
-            # PROD: drop the field silently
-            continue
-        
-        # Truncate long strings
-        if isinstance(value, str) and len(value) > _MAX_METADATA_STRING_LENGTH:
-            if debug:
-                raise AssertionError(
-                    f"Privacy violation in {context}: string too long for key '{key}' "
-                    f"({len(value)} chars > {_MAX_METADATA_STRING_LENGTH}). "
-                    f"Metadata should only contain counts/ids, not content."
-                )
-            # PROD: truncate
-            sanitized[key] = value[:_MAX_METADATA_STRING_LENGTH] + "...[truncated]"
-        elif isinstance(value, dict):
-            # Recursively sanitize nested dicts
-            sanitized[key] = sanitize_for_logging(value, context)
-        elif isinstance(value, list):
-            # For lists, sanitize each item if dict, otherwise keep as-is (if short)
-            sanitized[key] = [
-                sanitize_for_logging(item, context) if isinstance(item, dict) else item
-                for item in value[:10]  # Limit list size
-            ]
-        else:
-            sanitized[key] = value
+    # Iterative walk (no recursion): worklist of (source dict, sanitized output dict).
+    # Nested output dicts are created up front and filled in when their entry is popped.
+    stack = deque([(data, sanitized)])
+    while stack:
+        source, target = stack.popleft()
+        for key, value in source.items():
+            key_lower = key.lower()
+            
+            # Check for forbidden keys (content or source identifiers)
+            if key_lower in forbidden_keys:
+                violations.append(key)
+                if debug:
+                    violation_type = "source identifier" if key_lower in _FORBIDDEN_SOURCE_KEYS else "content"
+                    raise AssertionError(
+                        f"Privacy violation in {context}: forbidden {violation_type} key '{key}' found. "
+                        f"Source identifiers and content are never allowed in logs/audit when SOURCE_SAFETY_MODE is enabled."
+                    )
+                # PROD: drop the field silently
+                continue
+            
+            # One type() lookup instead of an isinstance() chain per value
+            kind = _VALUE_KINDS.get(type(value)) or _value_kind(value)
+            
+            # Truncate long strings
+            if kind == "str" and len(value) > _MAX_METADATA_STRING_LENGTH:
+                if debug:
+                    raise AssertionError(
+                        f"Privacy violation in {context}: string too long for key '{key}' "
+                        f"({len(value)} chars > {_MAX_METADATA_STRING_LENGTH}). "
+                        f"Metadata should only contain counts/ids, not content."
+                    )
+                # PROD: truncate
+                target[key] = value[:_MAX_METADATA_STRING_LENGTH] + "...[truncated]"
+            elif kind == "dict":
+                # Sanitize nested dicts (queued)
+                child: Dict[str, Any] = {}
+                target[key] = child
+                stack.append((value, child))
+            elif kind == "list":
+                # For lists, sanitize each item if dict, otherwise keep as-is (if short)
+                items = []
+                for item in islice(value, 10):  # Limit list size (no slice copy)
+                    if isinstance(item, dict):
+                        child = {}
+                        stack.append((item, child))
+                        items.append(child)
+                    else:
+                        items.append(item)
+                target[key] = items
+            else:
+                target[key] = value
     
-    # Log warning in PROD if violations found (but don't fail)
-    if violations and not debug:
+    # Log warning in PROD if violations found (but don't fail); skip building extra if WARNING is filtered
+    if violations and not debug and logger.isEnabledFor(logging.WARNING):
         logger.warning(
             "privacy_guard_violation",
             extra={
@@ -139,42 +190,51 @@ def sanitize_for_logging(data: Dict[str, Any], context: str = "log") -> Dict[str
     return sanitized
 
 
-def assert_no_content(data: Dict[str, Any], context: str = "audit") -> None:
+def assert_no_content(data: Dict[str, Any], context: str = "audit", collect_all: bool = False) -> None:
     """Assert that data contains no content or source identifier fields (strict check).
     
     Args:
         data: Data dictionary to check
         context: Context for error message
+        collect_all: Walk the whole payload and report every violating path
+            (default: stop at the first violation)
         
     Raises:
         AssertionError: If forbidden content or source keys found
     """
+    settings = get_settings()
     violations: Set[str] = set()
     
-    # Combine forbidden keys
-    forbidden_keys = _FORBIDDEN_CONTENT_KEYS
-    if source_safety_mode:
-        forbidden_keys = forbidden_keys | _FORBIDDEN_SOURCE_KEYS
+    # Forbidden keys (content, + source protection in SOURCE_SAFETY_MODE)
+    forbidden_keys = _FORBIDDEN_ALL_KEYS if settings.source_safety_mode else _FORBIDDEN_CONTENT_KEYS
     
-    def _check_dict(d: Dict[str, Any], path: str = "") -> None:
+    # Iterative walk (no recursion): worklist of (dict, path)
+    stack = deque([(data, "")])
+    while stack:
+        d, path = stack.popleft()
         for key, value in d.items():
-            key_lower = key.lower()
+            forbidden = key.lower() in forbidden_keys
+            # Plain (non-container) values of allowed keys: no path string needed
+            if not forbidden and not isinstance(value, (dict, list)):
+                continue
             current_path = f"{path}.{key}" if path else key
             
-            if key_lower in forbidden_keys:
+            if forbidden:
                 violations.add(current_path)
+                if not collect_all:
+                    # Fail fast: one violation is enough to raise
+                    stack.clear()
+                    break
             
             if isinstance(value, dict):
-                _check_dict(value, current_path)
+                stack.append((value, current_path))
             elif isinstance(value, list):
                 for idx, item in enumerate(value):
                     if isinstance(item, dict):
-                        _check_dict(item, f"{current_path}[{idx}]")
-    
-    _check_dict(data)
+                        stack.append((item, f"{current_path}[{idx}]"))
     
     if violations:
-        violation_type = "content or source identifiers" if source_safety_mode else "content"
+        violation_type = "content or source identifiers" if settings.source_safety_mode else "content"
         raise AssertionError(
             f"Privacy violation in {context}: forbidden {violation_type} keys found: {violations}. "
             f"Content and source identifiers must never appear in logs/audit."
@@ -190,7 +250,34 @@ def compute_integrity_hash(content: str) -> str:
     Returns:
         SHA256 hex digest
     """
-    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    if len(content) <= _INTEGRITY_HASH_CHUNK_CHARS:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    # Large content (transcripts, file bodies): encode + hash per chunk so peak memory
+    # holds one encoded chunk, not a full UTF-8 copy. Same digest as hashing it in one go.
+    h = hashlib.sha256()
+    for start in range(0, len(content), _INTEGRITY_HASH_CHUNK_CHARS):
+        h.update(content[start:start + _INTEGRITY_HASH_CHUNK_CHARS].encode("utf-8"))
+    return h.hexdigest()
+
+
+def compute_integrity_hashes(contents: List[str]) -> List[str]:
+    """Compute SHA256 hashes for many contents (e.g. per segment), in input order.
+    
+    hashlib releases the GIL while hashing larger buffers, so large batches are hashed
+    on a small thread pool; small batches are hashed inline (no pool overhead).
+    
+    Args:
+        contents: Content strings to hash
+        
+    Returns:
+        SHA256 hex digests, same order as contents
+    """
+    if len(contents) < 2 or sum(map(len, contents)) < _INTEGRITY_HASH_PARALLEL_MIN_CHARS:
+        return [compute_integrity_hash(content) for content in contents]
+    
+    with ThreadPoolExecutor(max_workers=min(_INTEGRITY_HASH_MAX_WORKERS, len(contents))) as pool:
+        return list(pool.map(compute_integrity_hash, contents))
 
 
 def verify_integrity(content: str, expected_hash: str) -> bool:
@@ -204,5 +291,7 @@ def verify_integrity(content: str, expected_hash: str) -> bool:
         True if hash matches, False otherwise
     """
     actual_hash = compute_integrity_hash(content)
-    return actual_hash == expected_hash
+    # Constant-time comparison (no early exit on first differing char). Bytes, not str:
+    # compare_digest raises TypeError for non-ASCII str, where the old == returned False.
+    return hmac.compare_digest(actual_hash.encode(), expected_hash.encode('utf-8', 'surrogatepass'))
 
@@ -8,6 +8,8 @@ def check_leaks(text: str, mode: str = "balanced") -> None:
     Check for remaining PII leaks in masked text (blocking).
     
     This is a FAIL-CLOSED check: ANY detected PII pattern = BLOCK.
+    Stops at the first match (one scan over the combined pattern); use
+    regex_masker.count_leaks() when per-rule counts are needed.
     
     Args:
         text: Masked text to check
@@ -16,14 +18,9 @@ def check_leaks(text: str, mode: str = "balanced") -> None:
     Raises:
         PrivacyLeakError: If leaks detected
     """
-    leaks = regex_masker.count_leaks(text)
-    
-    # Count total leaks - ANY leak is a failure (fail-closed)
-    total_leaks = sum(leaks.values())
-    
-    if total_leaks > 0:
+    # ANY leak is a failure (fail-closed) - no need to count them all
+    if regex_masker.contains_pii(text):
         raise PrivacyLeakError(
-            f"Privacy leak detected: {total_leaks} potential PII entities remaining",
+            "Privacy leak detected: potential PII entities remaining",
             error_code="pii_detected"
         )
-
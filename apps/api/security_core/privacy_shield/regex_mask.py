@@ -3,8 +3,75 @@
 Masks: email, phone, Swedish personal number (PNR), ID-like patterns, addresses/postcodes.
 """
 import re
-from typing import Dict, List, Tuple
-from .models import PrivacyLog
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+
+def _scoped(pattern: re.Pattern) -> str:
+    """Return pattern source with its IGNORECASE flag scoped to the pattern itself."""
+    if pattern.flags & re.IGNORECASE:
+        return f"(?i:{pattern.pattern})"
+    return f"(?:{pattern.pattern})"
+
+
+class _AtAnchoredPattern:
+    """
+    Linear-time finditer/subn for an email regex whose match starts with a [chars]+ run before "@".
+    
+    Run on its own, the stdlib engine retries [chars]+ from every start position inside a long
+    run that never reaches a usable "@" (quadratic: ~1 min for 50k chars). Every start inside
+    the run in front of an "@" reaches that same "@", so only the first eligible start per "@"
+    is tried. The matches (spans and leftmost order) are exactly those of the plain pattern.
+    """
+    
+    def __init__(self, pattern: re.Pattern, before_at: str, word_start: bool = False):
+        """
+        Args:
+            pattern: The full email regex (unbounded quantifiers, matched as-is)
+            before_at: Regex for the chars a match can span in front of its "@", read right to left
+            word_start: Match must start at \b (as the pattern's leading \b requires)
+        """
+        self.pattern = pattern
+        self._before_at = re.compile(before_at, pattern.flags)
+        self._word_start = re.compile(r'\b', pattern.flags) if word_start else None
+    
+    def finditer(self, text: str) -> Iterator[re.Match]:
+        at = text.find('@')
+        if at == -1:
+            return
+        reversed_text = text[::-1]
+        length = len(text)
+        pos = 0
+        while at != -1:
+            span = self._before_at.match(reversed_text, length - at).end() - (length - at)
+            start = max(pos, at - span)
+            if self._word_start is not None:
+                boundary = self._word_start.search(text, start, at)
+                start = boundary.start() if boundary else at
+            match = self.pattern.match(text, start) if start < at else None
+            if match:
+                yield match
+                pos = match.end()
+                at = text.find('@', pos)
+            else:
+                at = text.find('@', at + 1)
+    
+    def search(self, text: str) -> Optional[re.Match]:
+        return next(self.finditer(text), None)
+    
+    def subn(self, repl: Union[str, Callable[[re.Match], str]], text: str) -> Tuple[str, int]:
+        parts = []
+        last = 0
+        for match in self.finditer(text):
+            parts.append(text[last:match.start()])
+            parts.append(repl(match) if callable(repl) else match.expand(repl))
+            last = match.end()
+        if not parts:
+            return text, 0
+        parts.append(text[last:])
+        return ''.join(parts), len(parts) // 2
+    
+    def sub(self, repl: Union[str, Callable[[re.Match], str]], text: str) -> str:
+        return self.subn(repl, text)[0]
 
 
 class RegexMasker:
@@ -15,9 +82,26 @@ class RegexMasker:
         # Email pattern (common formats)
         # Supports: standard ASCII, unicode chars (åäö), and handles spaces/linebreaks by normalizing first
         # Note: We normalize input text before matching to handle spaces/linebreaks in email
-        self.email_pattern = re.compile(
-            r'\b[A-Za-z0-9._%+\u00C0-\u017F-]+@[A-Za-z0-9.\u00C0-\u017F-]+\.[A-Z|a-z]{2,}\b',
-            re.IGNORECASE | re.UNICODE
+        # Unbounded quantifiers: an address is masked whole, however long. _AtAnchoredPattern
+        # keeps the scan linear (no retry from every start position inside a long run).
+        self.email_pattern = _AtAnchoredPattern(
+            re.compile(
+                r'\b[A-Za-z0-9._%+\u00C0-\u017F-]+@[A-Za-z0-9.\u00C0-\u017F-]+\.[A-Z|a-z]{2,}\b',
+                re.IGNORECASE | re.UNICODE
+            ),
+            r'[A-Za-z0-9._%+\u00C0-\u017F-]*',
+            word_start=True,
+        )
+        
+        # Email obfuscation normalizers used by mask() (compiled once, not looked up per call):
+        # "name @ domain.se" -> "name@domain.se", "name@domain\n.se" -> "name@domain.se"
+        self._email_spaced_at_pattern = _AtAnchoredPattern(
+            re.compile(r'([a-zA-Z0-9._%+\u00C0-\u017F-]+)\s+@\s+([a-zA-Z0-9.\u00C0-\u017F-]+)'),
+            r'\s*[a-zA-Z0-9._%+\u00C0-\u017F-]*',
+        )
+        self._email_broken_tld_pattern = _AtAnchoredPattern(
+            re.compile(r'([a-zA-Z0-9._%+\u00C0-\u017F-]+)@([a-zA-Z0-9.\u00C0-\u017F-]+)\s*[\n\r]+\s*\.([a-zA-Z]{2,})'),
+            r'[a-zA-Z0-9._%+\u00C0-\u017F-]*',
         )
         
         # Phone pattern (Swedish formats: +46..., 070-..., 08-..., etc.)
@@ -30,8 +114,14 @@ class RegexMasker:
         #   - International: +46 followed by spaces/dashes, then full number
         #   - Swedish with parentheses: (0XX) followed by number
         #   - Swedish: 0 followed by area code (0-9 for area codes like 031, 040, or 7X for mobile, or 8-9 for Stockholm), then rest
+        # The two +46 branches share one literal prefix, and each branch starts with a distinct
+        # first char (+, (, 0), so the engine commits to one branch instead of trying all of them.
         self.phone_pattern = re.compile(
-            r'(?<!\d)(\+46[\s\-]+\d{1,2}[\s\-]+\d{1}[\s\-]*\d{2,3}[\s\-]*\d{2}[\s\-]*\d{2}[\s\-]*\d{0,2}|\+46[\s\-]?\d{9,10}|\(0\d{1,2}\)[\s\-]*\d{2,3}[\s\-]?\d{2}[\s\-]?\d{2}[\s\-]?\d{0,2}|0[0-9]\d{0,1}[\s\-]?\d{2,3}[\s\-]?\d{2}[\s\-]?\d{2}[\s\-]?\d{0,2})(?!\d)',
+            r'(?<!\d)('
+            r'\+46(?:[\s\-]+\d{1,2}[\s\-]+\d{1}[\s\-]*\d{2,3}[\s\-]*\d{2}[\s\-]*\d{2}[\s\-]*\d{0,2}|[\s\-]?\d{9,10})'
+            r'|\(0\d{1,2}\)[\s\-]*\d{2,3}[\s\-]?\d{2}[\s\-]?\d{2}[\s\-]?\d{0,2}'
+            r'|0[0-9]\d{0,1}[\s\-]?\d{2,3}[\s\-]?\d{2}[\s\-]?\d{2}[\s\-]?\d{0,2}'
+            r')(?!\d)',
             re.IGNORECASE
         )
         
@@ -56,8 +146,33 @@ class RegexMasker:
             r'\b[A-ZÅÄÖ][a-zåäö]+gatan?\s+\d+[A-Z]?\b',
             re.IGNORECASE
         )
+        
+        # Any (Unicode) digit, same \d as in the rules above
+        self._digit_pattern = re.compile(r'\d')
+        
+        # ID-like tokens as mask()/count_leaks() treat them: pure numbers are not IDs,
+        # so at least one letter is required (same as the isdigit() filter).
+        self._id_with_letter_pattern = re.compile(
+            r'\b(?=[0-9]*[A-Z])[A-Z0-9]{8,}\b'
+        )
+        
+        # Combined pattern: all rules in one alternation (flags scoped per rule so ID/PNR/POSTCODE
+        # stay case-sensitive). One search answers "any PII at all?" in a single scan.
+        # Email is checked separately (see _AtAnchoredPattern), only when the text has an "@".
+        self._combined = re.compile(
+            "|".join(
+                _scoped(pattern)
+                for pattern in (
+                    self.pnr_pattern,
+                    self.phone_pattern,
+                    self._id_with_letter_pattern,
+                    self.postcode_pattern,
+                    self.address_pattern,
+                )
+            )
+        )
     
-    def mask(self, text: str) -> Tuple[str, Dict[str, int], List[PrivacyLog]]:
+    def mask(self, text: str) -> Tuple[str, Dict[str, int], List[Tuple[str, int]]]:
         """
         Mask PII in text using regex patterns.
         
@@ -65,12 +180,16 @@ class RegexMasker:
             text: Input text
             
         Returns:
-            Tuple of (masked_text, entity_counts, privacy_logs)
+            Tuple of (masked_text, entity_counts, privacy_logs) where privacy_logs are
+            (rule, count) tuples; the service turns them into PrivacyLog once per request
         """
         # Normalize text for email detection: handle obfuscation attempts
         # Strategy: Normalize spaces/linebreaks around @ symbol to catch obfuscated emails
-        normalized_text = re.sub(r'([a-zA-Z0-9._%+\u00C0-\u017F-]+)\s+@\s+([a-zA-Z0-9.\u00C0-\u017F-]+)', r'\1@\2', text)
-        normalized_text = re.sub(r'([a-zA-Z0-9._%+\u00C0-\u017F-]+)@([a-zA-Z0-9.\u00C0-\u017F-]+)\s*[\n\r]+\s*\.([a-zA-Z]{2,})', r'\1@\2.\3', normalized_text)
+        # Both normalizers need an "@" - skip them entirely for text without one
+        normalized_text = text
+        if "@" in normalized_text:
+            normalized_text = self._email_spaced_at_pattern.sub(r'\1@\2', normalized_text)
+            normalized_text = self._email_broken_tld_pattern.sub(r'\1@\2.\3', normalized_text)
         
         masked_text = normalized_text
         entity_counts = {
@@ -82,59 +201,86 @@ class RegexMasker:
         }
         privacy_logs = []
         
+        # Fast path: no rule matches anywhere -> the cascade below would not change anything
+        if not self.contains_pii(masked_text):
+            return masked_text, entity_counts, privacy_logs
+        
+        # Each rule is applied in ONE scan (subn = substitute + count), in cascade order.
+        # The order matters: a rule sees the output of the previous ones (PNR before phone, etc.),
+        # so the rules are not merged into a single leftmost-match sweep.
+        # A rule without matches costs no copy: sub/subn return the input str object unchanged.
+        # Text stays str (not UTF-8 bytes): bytes patterns would make \d, \b and IGNORECASE
+        # ASCII-only and break the åäö / \u00C0-\u017F classes.
+        
         # Mask emails first (most specific pattern)
-        email_count = len(self.email_pattern.findall(masked_text))
+        masked_text, email_count = self.email_pattern.subn("[EMAIL]", masked_text)
         if email_count > 0:
-            masked_text = self.email_pattern.sub("[EMAIL]", masked_text)
             entity_counts["contacts"] += email_count
-            privacy_logs.append(PrivacyLog(rule="EMAIL", count=email_count))
+            privacy_logs.append(("EMAIL", email_count))
+        
+        # Digit prefilter: PNR, phone, postcode and address all require a digit (\d), and masking
+        # only removes digits. One short-circuiting scan lets digit-free text skip those four passes.
+        has_digits = self._digit_pattern.search(masked_text) is not None
         
         # Mask PNR BEFORE phone (PNR is more specific pattern - must come first!)
         # This prevents PNR from being incorrectly matched as phone numbers
-        pnr_count = len(self.pnr_pattern.findall(masked_text))
+        pnr_count = 0
+        if has_digits:
+            masked_text, pnr_count = self.pnr_pattern.subn("[PNR]", masked_text)
         if pnr_count > 0:
-            masked_text = self.pnr_pattern.sub("[PNR]", masked_text)
             entity_counts["ids"] += pnr_count
-            privacy_logs.append(PrivacyLog(rule="PNR", count=pnr_count))
+            privacy_logs.append(("PNR", pnr_count))
         
         # Mask phone numbers (after PNR to avoid false matches)
         # Since PNR is already masked, we can safely count and substitute
         # But we need a better phone regex that doesn't match PNR patterns
         # For now, count after PNR masking to avoid false positives
-        phone_count = len(self.phone_pattern.findall(masked_text))
+        phone_count = 0
+        if has_digits:
+            masked_text, phone_count = self.phone_pattern.subn("[PHONE]", masked_text)
         if phone_count > 0:
-            masked_text = self.phone_pattern.sub("[PHONE]", masked_text)
             entity_counts["contacts"] += phone_count
-            privacy_logs.append(PrivacyLog(rule="PHONE", count=phone_count))
+            privacy_logs.append(("PHONE", phone_count))
         
         # Mask ID-like patterns (but be conservative - only if clearly ID-like)
-        id_matches = self.id_pattern.findall(masked_text)
-        # Filter out common words and numbers
-        id_count = sum(1 for m in id_matches if not m.isdigit() and len(m) >= 8)
+        # Filter out numbers: the letter lookahead in _id_with_letter_pattern replaces the
+        # per-match isdigit() callback, so the whole pass runs in C (no Python call per match)
+        masked_text, id_count = self._id_with_letter_pattern.subn("[ID]", masked_text)
         if id_count > 0:
-            for match in id_matches:
-                if not match.isdigit() and len(match) >= 8:
-                    masked_text = re.sub(r'\b' + re.escape(match) + r'\b', "[ID]", masked_text)
             entity_counts["ids"] += id_count
-            privacy_logs.append(PrivacyLog(rule="ID", count=id_count))
+            privacy_logs.append(("ID", id_count))
         
         # Mask postcodes (but be careful - could be other numbers)
-        postcode_count = len(self.postcode_pattern.findall(masked_text))
+        postcode_count = 0
+        if has_digits:
+            masked_text, postcode_count = self.postcode_pattern.subn("[POSTCODE]", masked_text)
         # Only mask if it looks like a postcode in context (5 digits, possibly with space)
         if postcode_count > 0:
-            masked_text = self.postcode_pattern.sub("[POSTCODE]", masked_text)
             entity_counts["locations"] += postcode_count
-            privacy_logs.append(PrivacyLog(rule="POSTCODE", count=postcode_count))
+            privacy_logs.append(("POSTCODE", postcode_count))
         
         # Mask addresses (street + number)
-        address_count = len(self.address_pattern.findall(masked_text))
+        address_count = 0
+        if has_digits:
+            masked_text, address_count = self.address_pattern.subn("[ADDRESS]", masked_text)
         if address_count > 0:
-            masked_text = self.address_pattern.sub("[ADDRESS]", masked_text)
             entity_counts["locations"] += address_count
-            privacy_logs.append(PrivacyLog(rule="ADDRESS", count=address_count))
+            privacy_logs.append(("ADDRESS", address_count))
         
         return masked_text, entity_counts, privacy_logs
     
+    def contains_pii(self, text: str) -> bool:
+        """
+        Check if any masking rule matches text (email scan if there is an "@", then one combined scan).
+        
+        Args:
+            text: Text to check
+            
+        Returns:
+            True if at least one rule matches
+        """
+        return self.email_pattern.search(text) is not None or self._combined.search(text) is not None
+    
     def count_leaks(self, text: str) -> Dict[str, int]:
         """
         Count remaining PII patterns in text (for leak check).
@@ -146,7 +292,7 @@ class RegexMasker:
             Dict with counts per pattern type
         """
         return {
-            "email": len(self.email_pattern.findall(text)),
+            "email": sum(1 for _ in self.email_pattern.finditer(text)),
             "phone": len(self.phone_pattern.findall(text)),
             "pnr": len(self.pnr_pattern.findall(text)),
             "id": len([m for m in self.id_pattern.findall(text) if not m.isdigit() and len(m) >= 8]),
@@ -3,10 +3,11 @@ import time
 import logging
 from fastapi import HTTPException
 
-from ..config import privacy_max_chars, CONTROL_MODEL_ENABLED
+from ..config import get_settings
 from .models import (
     PrivacyMaskRequest,
     PrivacyMaskResponse,
+    PrivacyLog,
     ControlResult,
     PrivacyLeakError
 )
@@ -37,6 +38,8 @@ async def mask_text(request: PrivacyMaskRequest, request_id: str) -> PrivacyMask
         HTTPException: If validation fails or leak detected
     """
     start_time = time.time()
+    settings = get_settings()
+    privacy_max_chars = settings.privacy_max_chars
     
     # Validate input length
     if len(request.text) > privacy_max_chars:
@@ -60,26 +63,23 @@ async def mask_text(request: PrivacyMaskRequest, request_id: str) -> PrivacyMask
         masked_text, entity_counts, privacy_logs = regex_masker.mask(request.text)
         provider = "regex"
         
-        # Pass 2: Re-mask on result (catches overlaps, edge cases, missed hits)
-        # This is critical for edge cases with many repetitions
-        masked_text_pass2, additional_counts, additional_logs = regex_masker.mask(masked_text)
-        
-        # Only use pass2 if it actually changed something (avoid infinite loops)
-        if masked_text_pass2 != masked_text:
-            masked_text = masked_text_pass2
+        # Pass 2 (+ pass 3 in strict mode): Re-mask on result (catches overlaps, edge cases, missed hits).
+        # Clean output stops here: without "@" the email normalization is a no-op, and a single
+        # scan over the combined pattern tells if any rule would still match.
+        max_passes = 3 if request.mode == "strict" else 2
+        for _ in range(max_passes - 1):
+            if "@" not in masked_text and not regex_masker.contains_pii(masked_text):
+                break
+            masked_text_next, additional_counts, additional_logs = regex_masker.mask(masked_text)
+            
+            # Only use next pass if it actually changed something (avoid infinite loops)
+            if masked_text_next == masked_text:
+                break
+            masked_text = masked_text_next
             # Merge counts and logs
             for key in entity_counts:
                 entity_counts[key] += additional_counts.get(key, 0)
             privacy_logs.extend(additional_logs)
-        
-        # Pass 3 (strict mode only): One more pass for maximum safety
-        if request.mode == "strict":
-            masked_text_pass3, additional_counts3, additional_logs3 = regex_masker.mask(masked_text)
-            if masked_text_pass3 != masked_text:
-                masked_text = masked_text_pass3
-                for key in entity_counts:
-                    entity_counts[key] += additional_counts3.get(key, 0)
-                privacy_logs.extend(additional_logs3)
                 
     except Exception as e:
         error_type = type(e).__name__
@@ -122,7 +122,7 @@ async def mask_text(request: PrivacyMaskRequest, request_id: str) -> PrivacyMask
     # C) Control check (ADVISORY, strict mode only) - INACTIVE
     # Control check path is preserved for minimal diff but inactive via CONTROL_MODEL_ENABLED flag
     control_result = ControlResult(ok=True, reasons=[])
-    if request.mode == "strict" and CONTROL_MODEL_ENABLED:
+    if request.mode == "strict" and settings.control_model_enabled:
         # NOTE: llamacpp_provider import removed - control check path inactive
         # Original code preserved below for reference (minimal diff):
         # if llamacpp_provider.is_enabled():
@@ -144,11 +144,13 @@ async def mask_text(request: PrivacyMaskRequest, request_id: str) -> PrivacyMask
         }
     )
     
-    return PrivacyMaskResponse(
+    # All fields are built here from already-typed values (str, Dict[str, int], (str, int) logs,
+    # ControlResult): model_construct skips re-validating them on every request.
+    return PrivacyMaskResponse.model_construct(
         maskedText=masked_text,
         summary=None,
         entities=entity_counts,
-        privacyLogs=privacy_logs,
+        privacyLogs=[PrivacyLog.model_construct(rule=rule, count=count) for rule, count in privacy_logs],
         provider=provider,
         requestId=request_id,
         control=control_result
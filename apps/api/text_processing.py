@@ -4,9 +4,12 @@ Fail-closed: raises exceptions on errors.
 """
 import re
 import os
+import heapq
+import hashlib
+import threading
 from pathlib import Path
-from typing import Tuple, List, Optional
-from collections import Counter
+from typing import Iterator, Tuple, List, Optional
+from collections import Counter, OrderedDict
 
 
 class PiiGateError(Exception):
@@ -30,6 +33,8 @@ def extract_text_from_pdf(file_path: str) -> str:
         text_parts = []
         with open(file_path, 'rb') as f:
             pdf_reader = pypdf.PdfReader(f)
+            # Sekventiellt med flit: sidorna läser lat från samma ström (inte trådsäkert), och
+            # extract_text är ren Python under GIL - trådar med en reader per sida var ~2x långsammare.
             for page in pdf_reader.pages:
                 text = page.extract_text()
                 if text:
@@ -64,6 +69,11 @@ def extract_text_from_txt(file_path: str) -> str:
         raise ValueError(f"Failed to read TXT file: {str(e)}")
 
 
+# C0-kontrolltecken (utom \t och \n), DEL och C1 - tas bort via str.translate i C (ASCII-snabbväg)
+_CTRL_TRANSLATE = dict.fromkeys(i for i in range(0x20) if i not in (0x09, 0x0A))
+_CTRL_TRANSLATE.update(dict.fromkeys(range(0x7F, 0xA0)))
+
+
 def sanitize_journalist_note(raw_text: str) -> str:
     """
     Technical sanitization for journalist notes - NO language normalization, NO masking, NO AI.
@@ -85,19 +95,18 @@ def sanitize_journalist_note(raw_text: str) -> str:
     text = raw_text.strip()
     
     # Normalize line breaks: \r\n -> \n, \r -> \n
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    # (kedjad replace slår en \r\n?-regex när \r finns; utan \r hoppas båda passen över)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
     
     # Remove invisible control characters (except \n and \t)
     # Keep: \n (newline), \t (tab), and all printable characters
-    cleaned = []
-    for char in text:
-        if char == '\n' or char == '\t':
-            cleaned.append(char)
-        elif char.isprintable():
-            cleaned.append(char)
-        # Skip all other control characters
-    
-    text = ''.join(cleaned)
+    if text.isascii():
+        text = text.translate(_CTRL_TRANSLATE)
+    elif not text.replace('\n', '').replace('\t', '').isprintable():
+        # Utanför ASCII finns fler icke-utskrivbara tecken (t.ex. NBSP, zero-width, U+2028);
+        # per-tecken-filtret körs bara om texten faktiskt innehåller något sådant.
+        text = ''.join(char for char in text if char == '\n' or char == '\t' or char.isprintable())
     
     # Escape HTML/JS for security (prevent XSS)
     text = html.escape(text, quote=False)  # quote=False means don't escape quotes (preserve text)
@@ -105,6 +114,31 @@ def sanitize_journalist_note(raw_text: str) -> str:
     return text
 
 
+# Datum/tid-patterns för mask_datetime (kompileras en gång vid import)
+_SWEDISH_MONTHS_LONG = r'(?:januari|februari|mars|april|maj|juni|juli|augusti|september|oktober|november|december)'
+_SWEDISH_MONTHS_SHORT = r'(?:jan|feb|mar|apr|maj|jun|jul|aug|sep|sept|okt|nov|dec)'
+_ISO_DATE_RE = re.compile(r'\b(?:19|20)\d{2}[-/](?:0[1-9]|1[0-2])[-/](?:0[1-9]|[12]\d|3[01])\b')
+_DMY_DATE = r'\b(?:0?[1-9]|[12]\d|3[01])/(?:0?[1-9]|1[0-2])/(?:19|20)\d{2}\b'
+_SWEDISH_LONG_DATE = rf'\b(?:0?[1-9]|[12]\d|3[01])\s+{_SWEDISH_MONTHS_LONG}\s+(?:19|20)\d{{2}}\b'
+_SWEDISH_SHORT_DATE = rf'\b(?:0?[1-9]|[12]\d|3[01])\s+{_SWEDISH_MONTHS_SHORT}\.?\s+(?:19|20)\d{{2}}\b'
+_SWEDISH_DAY_MONTH = rf'\b(?:0?[1-9]|[12]\d|3[01])\s+{_SWEDISH_MONTHS_LONG}\b'
+# DD/MM/YYYY + svenska datumformat i en alternation (ett pass i stället för fyra).
+# Grenarna kan bara krocka på samma startposition, där ordningen nedan ger samma resultat
+# som de tidigare separata passen. ISO (före) och klockslag (efter) hålls som egna pass:
+# de kan överlappa dessa på andra startpositioner ("06/01/2026-01-06", "7:45/01/2026").
+_SWEDISH_DATE_RE = re.compile(
+    f'{_DMY_DATE}|{_SWEDISH_LONG_DATE}|{_SWEDISH_SHORT_DATE}|{_SWEDISH_DAY_MONTH}',
+    re.IGNORECASE,
+)
+_CLOCK_RE = re.compile(r'\b(?:kl\.?\s+)?(?:0?[0-9]|1\d|2[0-3])[:\.][0-5]\d\b', re.IGNORECASE)
+# Billiga substring-prefilter på text.lower() innan regexarna körs. Stammarna undviker 'i' och 's'
+# (IGNORECASE matchar även 'İ' och 'ſ', vars lower() inte blir 'i'/'s'), så varje regexträff
+# innehåller någon av dem; 'ſ' i texten tvingar månadspasset.
+_MONTH_STEMS = ('jan', 'feb', 'mar', 'apr', 'maj', 'jun', 'jul', 'aug', 'sep', 'okt', 'nov', 'dec', 'ſ')
+_RELATIVE_TIME_STEMS = ('går', 'dag', 'morgon')
+_RELATIVE_TIME_RE = re.compile(r'\b(?:igår|idag|imorgon|i går|i dag|i morgon|förrgår|övermorgon)\b', re.IGNORECASE)
+
+
 def mask_datetime(text: str, level: str = "strict") -> Tuple[str, dict]:
     """
     Mask datum/tid deterministiskt (fail-closed: datum aldrig exporteras externt).
@@ -117,38 +151,28 @@ def mask_datetime(text: str, level: str = "strict") -> Tuple[str, dict]:
         (masked_text, stats) där stats = {datetime_masked: bool, datetime_mask_count: int}
     """
     masked_count = 0
+    lowered = text.lower()
     
-    # DATUM-patterns (strict + paranoid)
-    # ISO datum: 2026-01-06, 2026/01/06
-    text, n = re.subn(r'\b(19|20)\d{2}[-/](0[1-9]|1[0-2])[-/](0[1-9]|[12]\d|3[01])\b', '[DATUM]', text)
-    masked_count += n
-    
-    # DD/MM/YYYY och D/M/YYYY
-    text, n = re.subn(r'\b(0?[1-9]|[12]\d|3[01])/(0?[1-9]|1[0-2])/(19|20)\d{2}\b', '[DATUM]', text)
-    masked_count += n
-    
-    # Svenska månader (lång form): "6 januari 2026", "12 maj 2024"
-    swedish_months_long = r'(januari|februari|mars|april|maj|juni|juli|augusti|september|oktober|november|december)'
-    text, n = re.subn(rf'\b(0?[1-9]|[12]\d|3[01])\s+{swedish_months_long}\s+(19|20)\d{{2}}\b', '[DATUM]', text, flags=re.IGNORECASE)
-    masked_count += n
-    
-    # Svenska månader (kort form): "6 jan 2026", "12 dec 2024"
-    swedish_months_short = r'(jan|feb|mar|apr|maj|jun|jul|aug|sep|sept|okt|nov|dec)'
-    text, n = re.subn(rf'\b(0?[1-9]|[12]\d|3[01])\s+{swedish_months_short}\.?\s+(19|20)\d{{2}}\b', '[DATUM]', text, flags=re.IGNORECASE)
-    masked_count += n
-    
-    # "6 januari", "12 maj" (utan år)
-    text, n = re.subn(rf'\b(0?[1-9]|[12]\d|3[01])\s+{swedish_months_long}\b', '[DATUM]', text, flags=re.IGNORECASE)
-    masked_count += n
-    
-    # Klockslag: "13:24", "7:45", "kl 13:24", "kl. 13:24"
-    text, n = re.subn(r'\b(kl\.?\s+)?(0?[0-9]|1\d|2[0-3])[:\.]([0-5]\d)\b', '[TID]', text, flags=re.IGNORECASE)
-    masked_count += n
+    # Alla datum/klockslag-patterns kräver siffror - text utan siffror hoppar direkt till relativa tidsord
+    if _DIGIT_RE.search(text):
+        # DATUM-patterns (strict + paranoid)
+        # ISO datum: 2026-01-06, 2026/01/06
+        text, n = _ISO_DATE_RE.subn('[DATUM]', text)
+        masked_count += n
+        
+        # DD/MM/YYYY och D/M/YYYY, svenska månader med år ("6 januari 2026", "12 dec 2024")
+        # och utan år ("6 januari", "12 maj")
+        if '/' in text or any(stem in lowered for stem in _MONTH_STEMS):
+            text, n = _SWEDISH_DATE_RE.subn('[DATUM]', text)
+            masked_count += n
+        
+        # Klockslag: "13:24", "7:45", "kl 13:24", "kl. 13:24"
+        text, n = _CLOCK_RE.subn('[TID]', text)
+        masked_count += n
     
     # PARANOID: relativa tidsord (svenska)
-    if level == "paranoid":
-        relative_time_words = r'\b(igår|idag|imorgon|i går|i dag|i morgon|förrgår|övermorgon)\b'
-        text, n = re.subn(relative_time_words, '[RELATIV_TID]', text, flags=re.IGNORECASE)
+    if level == "paranoid" and any(stem in lowered for stem in _RELATIVE_TIME_STEMS):
+        text, n = _RELATIVE_TIME_RE.subn('[RELATIV_TID]', text)
         masked_count += n
     
     stats = {
@@ -159,6 +183,9 @@ def mask_datetime(text: str, level: str = "strict") -> Tuple[str, dict]:
     return text, stats
 
 
+_EXCESS_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
 def normalize_text(text: str) -> str:
     """
     Basic text normalization:
@@ -166,10 +193,11 @@ def normalize_text(text: str) -> str:
     - Normalize line breaks
     """
     # Normalize line breaks
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
     
     # Remove excessive blank lines (max 2 consecutive)
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _EXCESS_BLANK_LINES_RE.sub('\n\n', text)
     
     # Remove trailing whitespace from lines
     lines = [line.rstrip() for line in text.split('\n')]
@@ -195,31 +223,118 @@ def mask_text(text: str, level: str = "normal") -> str:
         return mask_text_normal(text)
 
 
+# PII-patterns för mask_text_* (kompileras en gång vid import)
+# Email-mönstren är obegränsade så att hela adressen maskas oavsett längd; körs via
+# _email_finditer/_email_sub, inte direkt (se där).
+_EMAIL_RE = re.compile(r'\b[\w\.-]+@[\w\.-]+\.\w+\b', re.IGNORECASE)
+_EMAIL_LOCAL_RE = re.compile(r'[\w\.-]*')  # Local part-tecken, läses baklänges från '@'
+_WORD_BOUNDARY_RE = re.compile(r'\b')
+
+
+def _email_finditer(pattern: re.Pattern, text: str, word_start: bool = False) -> Iterator[re.Match]:
+    """
+    Linear-time finditer for an email pattern that starts with a [\w\.-]+ run before '@'.
+    
+    pattern.finditer() retries [\w\.-]+ from every start position inside a long run that never
+    reaches a usable '@' (quadratic, e.g. 'a.a.a...@'). Every start in the run in front of an
+    '@' reaches that same '@', so only the first eligible start per '@' is tried; the matches
+    are exactly those of pattern.finditer() (same algorithm as regex_mask._AtAnchoredPattern).
+    
+    Args:
+        pattern: Email regex whose match starts with the [\w\.-]+ local part
+        text: Text to scan
+        word_start: The pattern starts with \b
+    """
+    at = text.find('@')
+    if at == -1:
+        return
+    reversed_text = text[::-1]
+    length = len(text)
+    pos = 0
+    while at != -1:
+        span = _EMAIL_LOCAL_RE.match(reversed_text, length - at).end() - (length - at)
+        start = max(pos, at - span)
+        if word_start:
+            boundary = _WORD_BOUNDARY_RE.search(text, start, at)
+            start = boundary.start() if boundary else at
+        match = pattern.match(text, start) if start < at else None
+        if match:
+            yield match
+            pos = match.end()
+            at = text.find('@', pos)
+        else:
+            at = text.find('@', at + 1)
+
+
+def _email_sub(pattern: re.Pattern, repl: str, text: str, word_start: bool = False) -> str:
+    """pattern.sub(repl, text) for email patterns, via _email_finditer."""
+    parts = []
+    last = 0
+    for match in _email_finditer(pattern, text, word_start):
+        parts.append(text[last:match.start()])
+        parts.append(repl)
+        last = match.end()
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return ''.join(parts)
+
+
+_PERSONNUMMER_RE = re.compile(r'\b(?:19|20)\d{6}[- ]\d{4}\b|\b(?:19|20)\d{10}\b')
+# Swedish phone number patterns
+# Ordningen är semantisk (t.ex. maskas '-\d{4}' före tregruppsmönstret), så listan körs i
+# sekvens i stället för som en alternation. Mobilmönstret \b07\d[- ]... behövs inte här:
+# det är en delmängd av riktnummermönstret som körs före och hittar aldrig något nytt.
+_PHONE_RES = [
+    re.compile(r'\+46\s*\d{1,2}[- ]?\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}'),
+    re.compile(r'\b0\d{1,2}[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b'),
+    re.compile(r'-\d{4}\b'),
+    re.compile(r'\b\d{2,3}[- ]\d{2,3}[- ]\d{2,4}\b'),
+]
+_LONG_NUMBER_RE = re.compile(r'\b\d{11,}\b')
+_ID_LABEL_RES = [
+    re.compile(r'Dok\.Id\s+\d+', re.IGNORECASE),
+    re.compile(r'ID:\s*\d+', re.IGNORECASE),
+    re.compile(r'Id:\s*\d+', re.IGNORECASE),
+    re.compile(r'\bID\s+\d+', re.IGNORECASE),
+]
+# Sifferkluster med blanksteg/bindestreck ("24 698", "322-9448") eller fristående 5+ siffror.
+# Ett pass: klustergrenen provas först, samma resultat som de tidigare två passen i följd.
+_STRICT_NUM_RE = re.compile(r'\b(?!(?:19|20)\d{2}[- ]\d{2}[- ]\d{2})(?![\[PHONE\]\[EMAIL\]\[REDACTED\]\[ID\]\[NUM\]])\d{1,4}(?:[- ]\d{1,4}){1,4}\b|\b\d{5,}\b')
+_DIGIT_COUNT_TRANS = str.maketrans('', '', ' -')
+_NON_DIGIT_RE = re.compile(r'\D')
+_DIGIT_RE = re.compile(r'\d')
+_URL_RE = re.compile(r'https?://[^\s]+', re.IGNORECASE)
+# Namn efter etikett i radens början -> "<Etikett> [NAME]" (hela raden). En grupp per etikett
+# så att ersättningen får etikettens kanoniska form; [^\S\n] så att matchen aldrig korsar en radbrytning.
+_NAME_LABELS = ('Sökande', 'Motpart', 'Ombud', 'RÄTTEN', 'Rådmannen')
+_NAME_LABEL_RE = re.compile(
+    '^(?:' + '|'.join(f'({label})' for label in _NAME_LABELS) + r')[^\S\n]+.+',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
 def mask_text_normal(text: str) -> str:
     """Normal masking: email, phone, personnummer, long numbers"""
+    # Prefilter: email kräver '@', övriga patterns kräver siffror
+    has_digit = _DIGIT_RE.search(text) is not None
+    
     # Email pattern
-    email_pattern = r'\b[\w\.-]+@[\w\.-]+\.\w+\b'
-    text = re.sub(email_pattern, '[EMAIL]', text, flags=re.IGNORECASE)
+    if '@' in text:
+        text = _email_sub(_EMAIL_RE, '[EMAIL]', text, word_start=True)
+    
+    if not has_digit:
+        return text
     
     # Personnummer pattern (YYYYMMDD-XXXX or YYYYMMDDXXXX)
-    personnummer_pattern = r'\b(19|20)\d{6}[- ]\d{4}\b|\b(19|20)\d{10}\b'
-    text = re.sub(personnummer_pattern, '[REDACTED]', text)
+    text = _PERSONNUMMER_RE.sub('[REDACTED]', text)
     
     # Swedish phone number patterns
-    phone_patterns = [
-        r'\+46\s*\d{1,2}[- ]?\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}',
-        r'\b0\d{1,2}[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b',
-        r'\b07\d[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b',
-        r'-\d{4}\b',
-        r'\b\d{2,3}[- ]\d{2,3}[- ]\d{2,4}\b',
-    ]
-    
-    for pattern in phone_patterns:
-        text = re.sub(pattern, '[PHONE]', text)
+    for pattern in _PHONE_RES:
+        text = pattern.sub('[PHONE]', text)
     
     # Long numbers (>10 digits)
-    long_number_pattern = r'\b\d{11,}\b'
-    text = re.sub(long_number_pattern, '[REDACTED]', text)
+    text = _LONG_NUMBER_RE.sub('[REDACTED]', text)
     
     return text
 
@@ -233,18 +348,16 @@ def mask_text_strict(text: str) -> str:
     # Then run normal PII masking
     text = mask_text_normal(text)
     
-    # More aggressive ID label masking
-    id_label_patterns = [
-        r'Dok\.Id\s+\d+',
-        r'ID:\s*\d+',
-        r'Id:\s*\d+',
-        r'\bID\s+\d+',
-    ]
+    # ID-etiketter och sifferkluster kräver siffror
+    if not _DIGIT_RE.search(text):
+        return text
     
-    for pattern in id_label_patterns:
-        text = re.sub(pattern, '[ID]', text, flags=re.IGNORECASE)
+    # More aggressive ID label masking
+    for pattern in _ID_LABEL_RES:
+        text = pattern.sub('[ID]', text)
     
     # Mask spaced/hyphenated digit soups (e.g., "24 698", "322 9448")
+    # and standalone 5+ digit sequences
     # Pattern: sequences of digits separated by spaces/hyphens, total >= 5 digits
     # But exclude already masked tokens and dates
     def mask_digit_cluster(match):
@@ -252,8 +365,8 @@ def mask_text_strict(text: str) -> str:
         # Skip if it's already a token
         if any(token in matched for token in ['[PHONE]', '[EMAIL]', '[REDACTED]', '[ID]', '[NUM]']):
             return matched
-        # Count total digits
-        digit_count = len(re.sub(r'\D', '', matched))
+        # Count total digits (matchen innehåller bara siffror, blanksteg och bindestreck)
+        digit_count = len(matched.translate(_DIGIT_COUNT_TRANS))
         if digit_count >= 5:
             return '[NUM]'
         return matched
@@ -261,23 +374,7 @@ def mask_text_strict(text: str) -> str:
     # Match digit clusters with spaces/hyphens: "24 698", "322-9448", "123 45 67"
     # But avoid matching dates like "2025-11-20" (4 digits - 2 digits - 2 digits)
     # Also avoid matching already masked patterns
-    digit_cluster_pattern = r'\b(?!(?:19|20)\d{2}[- ]\d{2}[- ]\d{2})(?![\[PHONE\]\[EMAIL\]\[REDACTED\]\[ID\]\[NUM\]])\d{1,4}(?:[- ]\d{1,4}){1,4}\b'
-    text = re.sub(digit_cluster_pattern, mask_digit_cluster, text)
-    
-    # Also mask standalone 5+ digit sequences (not already masked)
-    # But check that it's not part of a token
-    def mask_standalone_digits(match):
-        matched = match.group()
-        # Check if surrounded by brackets (already a token)
-        start = match.start()
-        end = match.end()
-        if start > 0 and end < len(text):
-            if text[start-1] == '[' and text[end] == ']':
-                return matched
-        return '[NUM]'
-    
-    standalone_long_pattern = r'\b\d{5,}\b'
-    text = re.sub(standalone_long_pattern, '[NUM]', text)
+    text = _STRICT_NUM_RE.sub(mask_digit_cluster, text)
     
     return text
 
@@ -290,41 +387,64 @@ def mask_text_paranoid(text: str) -> str:
     text, _datetime_stats = mask_datetime(text, level="paranoid")
 
     # Replace emails and URLs with [LINK] first (before digit replacement)
-    email_pattern = r'\b[\w\.-]+@[\w\.-]+\.\w+\b'
-    text = re.sub(email_pattern, '[LINK]', text, flags=re.IGNORECASE)
+    if '@' in text:
+        text = _email_sub(_EMAIL_RE, '[LINK]', text, word_start=True)
     
-    url_pattern = r'https?://[^\s]+'
-    text = re.sub(url_pattern, '[LINK]', text, flags=re.IGNORECASE)
+    text = _URL_RE.sub('[LINK]', text)
     
     # Replace all digits 0-9 with [NUM] (preserve structure)
     # This ensures no numeric PII remains
-    text = re.sub(r'\d', '[NUM]', text)
+    # \d täcker alla Unicode-siffror (Nd). str.translate med en Nd->'[NUM]'-tabell är inte snabbare:
+    # mappning till flerteckenssträngar går inte CPythons ASCII-snabbväg (uppmätt 1,2-8x långsammare).
+    text = _DIGIT_RE.sub('[NUM]', text)
     
     # Mask names after known labels (preserve line structure)
-    lines = text.split('\n')
-    masked_lines = []
-    
-    name_label_patterns = [
-        (r'^Sökande\s+(.+)', r'Sökande [NAME]'),
-        (r'^Motpart\s+(.+)', r'Motpart [NAME]'),
-        (r'^Ombud\s+(.+)', r'Ombud [NAME]'),
-        (r'^RÄTTEN\s+(.+)', r'RÄTTEN [NAME]'),
-        (r'^Rådmannen\s+(.+)', r'Rådmannen [NAME]'),
-    ]
-    
-    for line in lines:
-        masked_line = line
-        for pattern, replacement in name_label_patterns:
-            if re.match(pattern, line, flags=re.IGNORECASE):
-                masked_line = re.sub(pattern, replacement, line, flags=re.IGNORECASE)
-                break
-        masked_lines.append(masked_line)
-    
-    text = '\n'.join(masked_lines)
+    text = _NAME_LABEL_RE.sub(lambda m: f'{_NAME_LABELS[m.lastindex - 1]} [NAME]', text)
     
     return text
 
 
+# Patterns för pii_gate_check (kompileras en gång vid import)
+_ALLOWED_TOKENS_RE = re.compile(r'\[(?:PHONE|EMAIL|PERSONNUMMER|ID|REDACTED|NUM|LINK|NAME)\]', re.IGNORECASE)
+# YYYYMMDD-XXXX, YYYYMMDDXXXX, YYMMDD-XXXX, YYMMDDXXXX
+_GATE_PERSONNUMMER_RES = [
+    re.compile(r'\b(?:19|20)\d{6}[- ]\d{4}\b'),  # YYYYMMDD-XXXX
+    re.compile(r'\b(?:19|20)\d{10}\b'),          # YYYYMMDDXXXX (12 digits)
+    re.compile(r'\b\d{6}[- ]\d{4}\b'),         # YYMMDD-XXXX
+    re.compile(r'\b\d{10}\b'),                 # YYMMDDXXXX (10 digits, but careful with context)
+]
+_BIRTHDATE_RE = re.compile(r'\b(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])\b')
+_DASHED_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_ISO_DATE_EXACT_RE = re.compile(r'^(?:19|20)\d{2}-\d{2}-\d{2}$')
+_GATE_EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+', re.IGNORECASE)
+# Require explicit prefix: starts with 0 or + (to avoid false positives like case numbers)
+_GATE_PHONE_RES = [
+    # Swedish format with country code: +46 70 123 45 67, +46701234567
+    re.compile(r'\+46\s*\d{1,2}[- ]?\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}'),
+    # Area code with separators: 031-123 45 67, 08-123 45 67 (must start with 0)
+    re.compile(r'\b0\d{1,2}[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b'),
+    # Mobile with separators: 070-123 45 67, 070-1234567 (must start with 07)
+    re.compile(r'\b07\d[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b'),
+]
+_GATE_LONG_NUMBER_RE = re.compile(r'\b\d{9,}\b')
+# Reason codes (generic, no raw values)
+_REASON_PERSONNUMMER = 'personnummer_detected'
+_REASON_BIRTHDATE = 'birthdate_like_sequence_detected'
+_REASON_EMAIL = 'email_detected'
+_REASON_PHONE = 'phone_detected'
+_REASON_UNMASKED_ID = 'unmasked_id_detected'
+_REASON_LONG_NUMBER = 'long_number_detected'
+# Literal-prefilter: personnummer-, födelsedatum- och långa-nummer-patterns kräver alla 6+ siffror i följd
+_GATE_DIGIT_RUN_RE = re.compile(r'\d{6}')
+
+
+def _is_gate_phone(matched_text: str) -> bool:
+    """Phone candidate counts if it has at least 7 digits and is not a YYYY-MM-DD date."""
+    if _ISO_DATE_EXACT_RE.match(matched_text):
+        return False
+    return len(_NON_DIGIT_RE.sub('', matched_text)) >= 7
+
+
 def pii_gate_check(text: str) -> Tuple[bool, List[str]]:
     """
     Deterministic PII gate check on already masked text.
@@ -344,118 +464,69 @@ def pii_gate_check(text: str) -> Tuple[bool, List[str]]:
     
     # Step 1: Remove allowed tokens to avoid false positives
     # Replace tokens with placeholders before pattern matching
-    allowed_tokens = [
-        r'\[PHONE\]',
-        r'\[EMAIL\]',
-        r'\[PERSONNUMMER\]',
-        r'\[ID\]',
-        r'\[REDACTED\]',
-        r'\[NUM\]',
-        r'\[LINK\]',
-        r'\[NAME\]'
-    ]
+    # Create a sanitized version for pattern matching (one pass for all allowed tokens)
+    sanitized = _ALLOWED_TOKENS_RE.sub('[TOKEN]', text)
     
-    # Create a sanitized version for pattern matching
-    sanitized = text
-    for token_pattern in allowed_tokens:
-        sanitized = re.sub(token_pattern, '[TOKEN]', sanitized, flags=re.IGNORECASE)
+    # Prefilter: alla kontroller nedan kräver siffror eller '@' (email)
+    if '@' not in sanitized and not _DIGIT_RE.search(sanitized):
+        return (True, reasons)
+    
+    # Utan en 6-siffrig följd kan steg 2, 3 och 7 inte matcha - ett pass i stället för sex
+    has_digit_run = _GATE_DIGIT_RUN_RE.search(sanitized) is not None
+    
+    # Varje steg lägger till högst en reason, i fast ordning - ingen dubblettkontroll behövs
     
     # Step 2: Check for personnummer patterns
     # YYYYMMDD-XXXX, YYYYMMDDXXXX, YYMMDD-XXXX, YYMMDDXXXX
-    personnummer_patterns = [
-        r'\b(19|20)\d{6}[- ]\d{4}\b',  # YYYYMMDD-XXXX
-        r'\b(19|20)\d{10}\b',          # YYYYMMDDXXXX (12 digits)
-        r'\b\d{6}[- ]\d{4}\b',         # YYMMDD-XXXX
-        r'\b\d{10}\b',                 # YYMMDDXXXX (10 digits, but careful with context)
-    ]
-    
-    for pattern in personnummer_patterns:
-        if re.search(pattern, sanitized):
-            if 'personnummer_detected' not in reasons:
-                reasons.append('personnummer_detected')
-            break
+    if has_digit_run and any(pattern.search(sanitized) for pattern in _GATE_PERSONNUMMER_RES):
+        reasons.append(_REASON_PERSONNUMMER)
     
     # Step 3: Check for standalone birthdate-like YYYYMMDD sequences
     # Pattern: (19|20)YY(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])
     # This matches valid dates in compact form (e.g., 19780126, 20251231)
     # But NOT YYYY-MM-DD (those are explicitly allowed)
-    birthdate_pattern = r'\b(19|20)\d{2}(0[1-9]|1[0-2])(0[1-9]|[12]\d|3[01])\b'
-    if re.search(birthdate_pattern, sanitized):
-        # Double-check: make sure it's not part of a date with dashes
-        # If we find YYYY-MM-DD nearby, it's probably a date, not a birthdate
-        birthdate_matches = re.finditer(birthdate_pattern, sanitized)
-        for match in birthdate_matches:
+    if has_digit_run:
+        for match in _BIRTHDATE_RE.finditer(sanitized):
             start, end = match.span()
-            # Check if this is part of a YYYY-MM-DD pattern
-            context_start = max(0, start - 20)
-            context_end = min(len(sanitized), end + 20)
-            context = sanitized[context_start:context_end]
-            # If we see YYYY-MM-DD pattern nearby, skip this match
-            if not re.search(r'\d{4}-\d{2}-\d{2}', context):
-                if 'birthdate_like_sequence_detected' not in reasons:
-                    reasons.append('birthdate_like_sequence_detected')
+            # Double-check: make sure it's not part of a date with dashes
+            # If we find YYYY-MM-DD nearby, it's probably a date, not a birthdate
+            context = sanitized[max(0, start - 20):end + 20]
+            if not _DASHED_DATE_RE.search(context):
+                reasons.append(_REASON_BIRTHDATE)
                 break
     
     # Step 4: Check for email patterns
-    email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-    if re.search(email_pattern, sanitized, flags=re.IGNORECASE):
-        reasons.append('email_detected')
+    if '@' in sanitized and next(_email_finditer(_GATE_EMAIL_RE, sanitized), None):
+        reasons.append(_REASON_EMAIL)
     
     # Step 5: Check for phone number patterns (broader: 7+ digits total)
     # Require explicit prefix: starts with 0 or + (to avoid false positives like case numbers)
     # Include variants with spaces, hyphens, and optional country code +46
     # BUT: exclude date patterns (YYYY-MM-DD) which have dashes but are not phones
-    phone_patterns = [
-        # Swedish format with country code: +46 70 123 45 67, +46701234567
-        r'\+46\s*\d{1,2}[- ]?\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}',
-        # Area code with separators: 031-123 45 67, 08-123 45 67 (must start with 0)
-        r'\b0\d{1,2}[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b',
-        # Mobile with separators: 070-123 45 67, 070-1234567 (must start with 07)
-        r'\b07\d[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b',
-    ]
-    
-    for pattern in phone_patterns:
-        matches = re.finditer(pattern, sanitized)
-        for match in matches:
-            # Count total digits in the match
-            matched_text = match.group()
-            digit_count = len(re.sub(r'\D', '', matched_text))
-            # Also check: if it looks like a date (YYYY-MM-DD), skip it
-            if re.match(r'^(19|20)\d{2}-\d{2}-\d{2}$', matched_text):
-                continue
-            # Require at least 7 digits total
-            if digit_count >= 7:
-                if 'phone_detected' not in reasons:
-                    reasons.append('phone_detected')
-                break
-        if 'phone_detected' in reasons:
-            break
+    if any(
+        _is_gate_phone(match.group())
+        for pattern in _GATE_PHONE_RES
+        for match in pattern.finditer(sanitized)
+    ):
+        reasons.append(_REASON_PHONE)
     
     # Step 6: Check for unmasked ID labels
-    id_label_patterns = [
-        r'Dok\.Id\s+\d+',
-        r'ID:\s*\d+',
-        r'Id:\s*\d+',
-        r'\bID\s+\d+',
-    ]
-    
-    for pattern in id_label_patterns:
-        if re.search(pattern, sanitized, flags=re.IGNORECASE):
-            if 'unmasked_id_detected' not in reasons:
-                reasons.append('unmasked_id_detected')
-            break
+    if any(pattern.search(sanitized) for pattern in _ID_LABEL_RES):
+        reasons.append(_REASON_UNMASKED_ID)
     
     # Step 7: Check for long numeric sequences (>8 digits, excluding tokens)
     # Find all sequences of 9+ consecutive digits
-    long_number_pattern = r'\b\d{9,}\b'
-    if re.search(long_number_pattern, sanitized):
-        reasons.append('long_number_detected')
+    if has_digit_run and _GATE_LONG_NUMBER_RE.search(sanitized):
+        reasons.append(_REASON_LONG_NUMBER)
     
     # Return result
     is_safe = len(reasons) == 0
     return (is_safe, reasons)
 
 
+_FILE_HEADER_BYTES = 64
+
+
 def validate_file_type(file_path: str, filename: str) -> Tuple[str, bool]:
     """
     Validate file type using extension + magic bytes.
@@ -468,9 +539,13 @@ def validate_file_type(file_path: str, filename: str) -> Tuple[str, bool]:
     ext = os.path.splitext(filename)[1].lower()
     
     # Read first bytes for magic number check
+    # Endast headern behövs (%PDF- + textsniff): en pread på fd, ingen BufferedReader
     try:
-        with open(file_path, 'rb') as f:
-            first_bytes = f.read(1024)
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            first_bytes = os.pread(fd, _FILE_HEADER_BYTES, 0)
+        finally:
+            os.close(fd)
     except Exception:
         return ('', False)
     
@@ -507,6 +582,7 @@ _stt_engine = None
 _stt_model = None
 _stt_engine_name = None
 _stt_model_name = None
+_stt_pipeline = None  # faster_whisper BatchedInferencePipeline (faster-whisper >= 1.1), annars None
 
 
 def _get_stt_engine():
@@ -522,7 +598,7 @@ def _get_stt_engine():
     Model defaults to "base" (demo sweetspot).
     "medium" model is blocked (fallback to "base").
     """
-    global _stt_engine, _stt_model, _stt_engine_name, _stt_model_name
+    global _stt_engine, _stt_model, _stt_engine_name, _stt_model_name, _stt_pipeline
     
     import os
     import logging
@@ -537,6 +613,7 @@ def _get_stt_engine():
         model_name = os.getenv("OPENAI_STT_MODEL", "whisper-1").strip() or "whisper-1"
         _stt_engine = None
         _stt_model = None
+        _stt_pipeline = None
         _stt_engine_name = engine_name
         _stt_model_name = model_name
         logger.info(f"[STT] Using OpenAI STT (no local preload): model={model_name}")
@@ -554,12 +631,37 @@ def _get_stt_engine():
         
         if engine_name == "faster_whisper":
             from faster_whisper import WhisperModel
-            _stt_engine = WhisperModel(model_name, device="cpu", compute_type="int8")
+            # CUDA + float16 (tensor cores) om CTranslate2 ser ett GPU, annars int8 på CPU.
+            # Överstyrs med WHISPER_DEVICE / WHISPER_COMPUTE (tomt = auto).
+            try:
+                import ctranslate2
+                has_cuda = ctranslate2.get_cuda_device_count() > 0
+            except Exception:
+                has_cuda = False
+            device = os.getenv("WHISPER_DEVICE", "").strip() or ("cuda" if has_cuda else "cpu")
+            compute_type = os.getenv("WHISPER_COMPUTE", "").strip() or ("float16" if device == "cuda" else "int8")
+            logger.info(f"[STT] faster_whisper device={device}, compute_type={compute_type}")
+            # Trådar per modell och antal parallella transcribe-anrop via env
+            # (WHISPER_CPU_THREADS=0 = CTranslate2-default)
+            _stt_engine = WhisperModel(
+                model_name,
+                device=device,
+                compute_type=compute_type,
+                cpu_threads=int(os.getenv("WHISPER_CPU_THREADS", "0")),
+                num_workers=int(os.getenv("WHISPER_NUM_WORKERS", "1")),
+            )
             _stt_model = None  # faster-whisper doesn't use separate model object
+            try:
+                # Batchad inferens över VAD-segment (faster-whisper >= 1.1)
+                from faster_whisper import BatchedInferencePipeline
+                _stt_pipeline = BatchedInferencePipeline(model=_stt_engine)
+            except ImportError:
+                _stt_pipeline = None
         elif engine_name == "whisper":
             import whisper
             _stt_model = whisper.load_model(model_name)
             _stt_engine = None  # whisper uses model object directly
+            _stt_pipeline = None
         else:
             raise ValueError(f"Unknown STT engine: {engine_name}. Supported: faster_whisper, whisper")
         
@@ -570,6 +672,29 @@ def _get_stt_engine():
     return _stt_engine, _stt_model, _stt_engine_name, _stt_model_name
 
 
+def warmup_stt() -> None:
+    """
+    Load the STT engine and run one dummy transcription.
+    
+    Called from the app startup hook so that the first real request neither pays the
+    model load nor CTranslate2's first-call kernel setup. Uses one second of in-memory
+    silence (no bundled audio file, nothing logged or stored).
+    """
+    import numpy as np
+    
+    engine, model, engine_name, model_name = _get_stt_engine()
+    silence = np.zeros(16000, dtype=np.float32)  # 1 s @ 16 kHz, Whispers samplingsfrekvens
+    
+    if engine_name == "faster_whisper":
+        # vad_filter=False: annars filtreras tystnaden bort och avkodaren körs aldrig
+        segments, _ = engine.transcribe(silence, language=None, vad_filter=False)
+        for _ in segments:  # segments är en generator; avkodning sker först vid iteration
+            pass
+    elif engine_name == "whisper":
+        model.transcribe(silence, language=None, task="transcribe")
+    # openai: ingen lokal modell att värma
+
+
 def transcribe_audio(audio_path: str) -> str:
     """
     Transcribe audio file using configured STT engine.
@@ -625,7 +750,23 @@ def transcribe_audio(audio_path: str) -> str:
                 )
             raw_transcript = resp.strip() if isinstance(resp, str) else str(resp).strip()
         elif engine_name == "faster_whisper":
-            segments, info = engine.transcribe(str(audio_path), language=None)
+            # VAD: tystnad hoppas över innan avkodning (färre FLOPs, färre hallucinationer på tystnad)
+            vad_parameters = dict(min_silence_duration_ms=500)
+            if _stt_pipeline is not None:
+                segments, info = _stt_pipeline.transcribe(
+                    str(audio_path),
+                    language=None,
+                    batch_size=int(os.getenv("WHISPER_BATCH_SIZE", "8")),
+                    vad_filter=True,
+                    vad_parameters=vad_parameters,
+                )
+            else:
+                segments, info = engine.transcribe(
+                    str(audio_path),
+                    language=None,
+                    vad_filter=True,
+                    vad_parameters=vad_parameters,
+                )
             detected_language = info.language if hasattr(info, 'language') else 'unknown'
             logger.info(f"[STT] Detected language: {detected_language}")
             raw_transcript = " ".join([segment.text for segment in segments]).strip()
@@ -666,6 +807,238 @@ def transcribe_audio(audio_path: str) -> str:
         raise RuntimeError(f"Audio transcription failed: {error_type}")
 
 
+# Common Swedish STT error mappings (deterministic, explicit)
+# Extended list based on real Whisper errors
+_STT_ERROR_MAPPINGS = {
+    # Common Whisper mishearings (from actual transcripts)
+    "konfliktsutom": "konflikter",
+    "önskimol": "önskemål",
+    "önskimolen": "önskemålen",
+    "öfomulerade": "oformulerade",
+    "ommedvetna": "omedvetna",
+    "nertonat": "nertonad",
+    "frustrerad agerande": "frustrerat agerande",
+    "involverad": "involverade",
+    "det är uppfattar": "det uppfattas",
+    "det är en konflikt består": "en konflikt består",
+    "inom form av sån": "i form av en sådan",
+    "sån situation": "sådan situation",
+    "drare": "drar",
+    "ytterstaspets": "yttersta spets",
+    "ytterstasyfte": "yttersta syfte",
+    "slå snere": "slå sig ner",
+    "höjer östen": "höjer rösten",
+    "börja gråta": "börjar gråta",
+    "skargång": "jargong",
+    "mål på jobbetor": "mår på jobbet",
+    "hämrisar": "hänvisar",
+    "förypa": "fördjupa",
+    "fördjupa sig": "fördjupa sig",
+    "beståndställer": "beståndsdelar",
+    "avröter": "avbröt",
+    "honsa hansa": "hon sa, han sa",
+    "Göteborgens": "Göteborgs",
+    "funnera": "definierar",
+    "funnera vi": "definierar vi",
+    "förstasked": "första skede",
+    "handtering": "hantering",
+    "bort dem": "bortom det",
+    "uppfattar som": "uppfattas som",
+    "praktiskt en": "praktiskt en",
+    "rätt visst": "rättvist",
+    "kallit upp oss": "hakat upp oss",
+    "kontors utrimmat": "kontorsutrymme",
+    "låter oerhört": "lade oerhört",
+    "gärna ett bra jobb": "gör ett bra jobb",
+    "lasa i stressen": "lade sig stressen",
+    "sjunk-iritationen": "sjönk irritationen",
+    "ovena": "ovänner",
+    "nåt är det igen": "återigen",
+    "bilder oss": "bildar oss",
+    # New error mappings from user feedback
+    "plasskar": "plaskar",
+    "plasskar med rom": "plaskar med rom",
+    "själva": "själv",
+    "längt": "länge",
+    "längt att": "länge att",
+    "längt att det": "länge att det",
+    "annorlunda": "annorlunda",
+    "hej och ho": "hej och välkommen",
+    # Repeated words (common STT artifact)
+    "det det": "det",
+    "och och": "och",
+    "är är": "är",
+    "som som": "som",
+    "för för": "för",
+    "i i": "i",
+    "av av": "av",
+    "med med": "med",
+    "till till": "till",
+    "på på": "på",
+    "om om": "om",
+    "en en": "en",
+    "ett ett": "ett",
+    "den den": "den",
+    # Common phrase corrections
+    "det vill säga att": "det vill säga",
+    "det är det": "det är",
+    "det här är": "detta är",
+    "det här": "detta",
+}
+
+
+def _trie_pattern(node: dict) -> str:
+    """Render a prefix trie as a regex: children first, then the optional word end."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')' + ('?' if '' in node else '')
+
+
+def _word_alternation(words) -> re.Pattern:
+    """
+    Compile \\b(w1|w2|...)\\b for lowercase words as a prefix trie (case-sensitive, see _replace_words).
+
+    A flat alternation made sre try every word at every word start (~80 branches for the
+    STT map); the trie follows one path per character. Backtracking tries the deepest word
+    end first, so the match is the longest word followed by \\b, same as longest-first order.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return re.compile(r'\b(' + _trie_pattern(trie) + r')\b')
+
+
+# Precompiled once: word boundaries to avoid partial matches. Körs i ordning, inte som en
+# alternation: tidigare nycklar vinner vid överlapp ("längt" före "längt att") och en rättning
+# kan skapa träffar för senare ("bort dem det här" -> "bortom det här" -> "bortom detta").
+# Utan inledande \b kan sre använda nyckeln som literal-prefix (snabb sökning i stället för ett
+# försök per position); _apply_stt_fixes kontrollerar ordgränsen före träffen själv.
+_STT_FIXES = tuple(
+    (
+        re.compile(r'\b' + re.escape(error) + r'\b', re.IGNORECASE),
+        re.compile(re.escape(error.lower()) + r'\b'),
+        correction,
+        error.lower(),
+    )
+    for error, correction in _STT_ERROR_MAPPINGS.items()
+)
+_REPEATED_WORD_RE = re.compile(r'\b(\w+)\s+\1\b', re.IGNORECASE)
+_DET_AR_DET_RE = re.compile(r'\bdet är det\b', re.IGNORECASE)
+# Versal efter meningsslut + punkt mellan ihopskrivna meningar i ett pass. Grenarna kan inte
+# skapa eller förstöra matchningar åt varandra, så resultatet är detsamma som två pass i följd.
+_SENTENCE_BOUNDARY_RE = re.compile(r'([.!?])\s+([a-zåäö])|([a-zåäö])([A-ZÅÄÖ])')
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPACE_BEFORE_PERIOD_RE = re.compile(r'\s+\.')
+_MULTI_PERIOD_RE = re.compile(r'\.\s*\.+')
+_COMMA_SPACING_RE = re.compile(r'\s+,\s*')
+_COLON_SPACING_RE = re.compile(r'\s+:\s*')
+_SEMICOLON_SPACING_RE = re.compile(r'\s+;\s*')
+_DASH_SPACING_RE = re.compile(r'\s+-\s+')
+_DET_AR_VERB_RE = re.compile(r'\bdet är (går|kommer|blir|finns)\b', re.IGNORECASE)
+_DET_AR_EN_BESTAR_RE = re.compile(r'\bdet är en (\w+) består\b', re.IGNORECASE)
+_DEFINIERAR_VI_RE = re.compile(r'\bdefinierar vi\b', re.IGNORECASE)
+_REPEATED_FILLER_RE = re.compile(r'\b(ja|alltså|liksom|typ)\s+\1\b', re.IGNORECASE)
+_DET_HAR_AR_RE = re.compile(r'\bdet här är\b', re.IGNORECASE)
+_DET_HAR_RE = re.compile(r'\bdet här\b', re.IGNORECASE)
+
+
+# Tecken som re.IGNORECASE matchar mot 'i'/'s' men som lower() inte mappar dit. Substring-
+# prefilter på text.lower() måste släppa igenom texter som innehåller något av dem.
+_IGNORECASE_ODDITIES = ('İ', 'ı', 'ſ')
+
+
+def _lookup_ignorecase(mapping: dict, word: str) -> str:
+    """Look up an IGNORECASE regex match in a dict keyed by lowercased literals."""
+    try:
+        return mapping[word.lower()]
+    except KeyError:
+        # IGNORECASE matchar även t.ex. 'ſ' och 'İ', vars lower() inte blir 's'/'i' (sällsynt)
+        return next(v for k, v in mapping.items() if re.fullmatch(re.escape(k), word, re.IGNORECASE))
+
+
+def _replace_words(pattern: re.Pattern, mapping: dict, text: str, lowered: Optional[str] = None) -> str:
+    """
+    Replace whole words matched by a _word_alternation pattern, case-insensitively.
+
+    Matches are found case-sensitively on text.lower() and spliced into the original text, so sre
+    does no per-character case folding. That is exact as long as lower() keeps every offset and
+    IGNORECASE would match nothing more; texts with 'İ'/'ı'/'ſ' take the IGNORECASE route instead.
+
+    Args:
+        pattern: Pattern from _word_alternation(mapping)
+        mapping: Lowercase word -> replacement
+        text: Text to fix
+        lowered: text.lower(), if the caller already has it
+
+    Returns:
+        Fixed text (the same object if nothing matched)
+    """
+    if any(odd in text for odd in _IGNORECASE_ODDITIES):
+        return re.compile(pattern.pattern, re.IGNORECASE).sub(
+            lambda match: _lookup_ignorecase(mapping, match.group(1)), text
+        )
+    pieces = []
+    end = 0
+    for match in pattern.finditer(text.lower() if lowered is None else lowered):
+        pieces.append(text[end:match.start()])
+        pieces.append(mapping[match.group(1)])
+        end = match.end()
+    if not pieces:
+        return text
+    pieces.append(text[end:])
+    return ''.join(pieces)
+
+
+def _apply_stt_fixes(text: str) -> str:
+    """
+    Apply _STT_FIXES in order, same result as one IGNORECASE re.sub per mapping.
+    
+    Mappings whose literal is absent from text.lower() are skipped. The rest are matched
+    case-sensitively on text.lower() and spliced into the original text (exact while lower()
+    keeps every offset, see _replace_words); texts with 'İ'/'ı'/'ſ' use the IGNORECASE patterns.
+    """
+    if any(odd in text for odd in _IGNORECASE_ODDITIES):
+        for pattern, _, correction, _ in _STT_FIXES:
+            text = pattern.sub(correction, text)
+        return text
+    lowered = text.lower()
+    for _, tail_pattern, correction, literal in _STT_FIXES:
+        if literal not in lowered:
+            continue
+        pieces = []
+        end = pos = 0
+        while True:
+            match = tail_pattern.search(lowered, pos)
+            if match is None:
+                break
+            start = match.start()
+            if not _WORD_BOUNDARY_RE.match(lowered, start):
+                pos = start + 1
+                continue
+            pieces.append(text[end:start])
+            pieces.append(correction)
+            end = pos = match.end()
+        if pieces:
+            pieces.append(text[end:])
+            text = ''.join(pieces)
+            lowered = text.lower()
+    return text
+
+
+def _fix_sentence_boundary(match: re.Match) -> str:
+    if match.group(1):
+        # Capitalize first letter after period, exclamation, question mark
+        return match.group(1) + ' ' + match.group(2).upper()
+    # Add period if missing between sentences
+    return match.group(3) + '. ' + match.group(4)
+
+
 def normalize_transcript_text(raw_text: str, use_enhanced: bool = True) -> str:
     """
     Normalize and enhance Swedish STT transcript output.
@@ -688,143 +1061,54 @@ def normalize_transcript_text(raw_text: str, use_enhanced: bool = True) -> str:
     
     text = raw_text
     
-    # Common Swedish STT error mappings (deterministic, explicit)
-    # Extended list based on real Whisper errors
-    stt_error_mappings = {
-        # Common Whisper mishearings (from actual transcripts)
-        "konfliktsutom": "konflikter",
-        "önskimol": "önskemål",
-        "önskimolen": "önskemålen",
-        "öfomulerade": "oformulerade",
-        "ommedvetna": "omedvetna",
-        "nertonat": "nertonad",
-        "frustrerad agerande": "frustrerat agerande",
-        "involverad": "involverade",
-        "det är uppfattar": "det uppfattas",
-        "det är en konflikt består": "en konflikt består",
-        "inom form av sån": "i form av en sådan",
-        "sån situation": "sådan situation",
-        "drare": "drar",
-        "ytterstaspets": "yttersta spets",
-        "ytterstasyfte": "yttersta syfte",
-        "slå snere": "slå sig ner",
-        "höjer östen": "höjer rösten",
-        "börja gråta": "börjar gråta",
-        "skargång": "jargong",
-        "mål på jobbetor": "mår på jobbet",
-        "hämrisar": "hänvisar",
-        "förypa": "fördjupa",
-        "fördjupa sig": "fördjupa sig",
-        "beståndställer": "beståndsdelar",
-        "avröter": "avbröt",
-        "honsa hansa": "hon sa, han sa",
-        "Göteborgens": "Göteborgs",
-        "funnera": "definierar",
-        "funnera vi": "definierar vi",
-        "förstasked": "första skede",
-        "handtering": "hantering",
-        "bort dem": "bortom det",
-        "uppfattar som": "uppfattas som",
-        "praktiskt en": "praktiskt en",
-        "rätt visst": "rättvist",
-        "kallit upp oss": "hakat upp oss",
-        "kontors utrimmat": "kontorsutrymme",
-        "låter oerhört": "lade oerhört",
-        "gärna ett bra jobb": "gör ett bra jobb",
-        "lasa i stressen": "lade sig stressen",
-        "sjunk-iritationen": "sjönk irritationen",
-        "ovena": "ovänner",
-        "nåt är det igen": "återigen",
-        "bilder oss": "bildar oss",
-        # New error mappings from user feedback
-        "plasskar": "plaskar",
-        "plasskar med rom": "plaskar med rom",
-        "själva": "själv",
-        "längt": "länge",
-        "längt att": "länge att",
-        "längt att det": "länge att det",
-        "annorlunda": "annorlunda",
-        "hej och ho": "hej och välkommen",
-        # Repeated words (common STT artifact)
-        "det det": "det",
-        "och och": "och",
-        "är är": "är",
-        "som som": "som",
-        "för för": "för",
-        "i i": "i",
-        "av av": "av",
-        "med med": "med",
-        "till till": "till",
-        "på på": "på",
-        "om om": "om",
-        "en en": "en",
-        "ett ett": "ett",
-        "den den": "den",
-        # Common phrase corrections
-        "det vill säga att": "det vill säga",
-        "det är det": "det är",
-        "det här är": "detta är",
-        "det här": "detta",
-    }
     
     # Apply error mappings (word boundaries to avoid partial matches)
-    for error, correction in stt_error_mappings.items():
-        # Use word boundaries for whole-word replacements
-        pattern = r'\b' + re.escape(error) + r'\b'
-        text = re.sub(pattern, correction, text, flags=re.IGNORECASE)
+    text = _apply_stt_fixes(text)
     
     # Remove repeated words (common STT artifact)
     # Pattern: word word (same word repeated with space)
-    text = re.sub(r'\b(\w+)\s+\1\b', r'\1', text, flags=re.IGNORECASE)
+    text = _REPEATED_WORD_RE.sub(r'\1', text)
     
     # Fix common sentence structure issues
     # Fix "det är det" -> "det är"
-    text = re.sub(r'\bdet är det\b', 'det är', text, flags=re.IGNORECASE)
-    
-    # Fix capitalization after sentence endings
-    # Capitalize first letter after period, exclamation, question mark
-    text = re.sub(r'([.!?])\s+([a-zåäö])', lambda m: m.group(1) + ' ' + m.group(2).upper(), text)
+    text = _DET_AR_DET_RE.sub('det är', text)
     
-    # Fix common punctuation issues
-    text = re.sub(r'([a-zåäö])([A-ZÅÄÖ])', r'\1. \2', text)  # Add period if missing between sentences
-    text = re.sub(r'\.\s+([a-zåäö])', r'. \1', text)  # Ensure space after period before lowercase
+    # Fix capitalization after sentence endings + missing period between sentences.
+    # (Efter versaliseringen finns ingen ". <gemen>" kvar, så ingen separat fix för det behövs.)
+    text = _SENTENCE_BOUNDARY_RE.sub(_fix_sentence_boundary, text)
     
     # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)  # Multiple spaces -> single space
-    text = re.sub(r'\s+\.', '.', text)  # Space before period -> period
-    text = re.sub(r'\.\s*\.+', '.', text)  # Multiple periods -> single period
-    text = re.sub(r'\s+,\s*', ', ', text)  # Normalize comma spacing
-    text = re.sub(r'\s+:\s*', ': ', text)  # Normalize colon spacing
-    text = re.sub(r'\s+;\s*', '; ', text)  # Normalize semicolon spacing
-    text = re.sub(r'\s+-\s+', ' - ', text)  # Normalize dash spacing
+    text = _WHITESPACE_RE.sub(' ', text)  # Multiple spaces -> single space
+    text = _SPACE_BEFORE_PERIOD_RE.sub('.', text)  # Space before period -> period
+    text = _MULTI_PERIOD_RE.sub('.', text)  # Multiple periods -> single period
+    text = _COMMA_SPACING_RE.sub(', ', text)  # Normalize comma spacing
+    text = _COLON_SPACING_RE.sub(': ', text)  # Normalize colon spacing
+    text = _SEMICOLON_SPACING_RE.sub('; ', text)  # Normalize semicolon spacing
+    text = _DASH_SPACING_RE.sub(' - ', text)  # Normalize dash spacing
     
     # Fix common Swedish grammar issues
     # "det är" + verb -> "det" + verb (when appropriate)
-    text = re.sub(r'\bdet är (går|kommer|blir|finns)\b', r'det \1', text, flags=re.IGNORECASE)
+    text = _DET_AR_VERB_RE.sub(r'det \1', text)
     
     # Fix common word order issues
     # "det är en X består" -> "en X består"
-    text = re.sub(r'\bdet är en (\w+) består\b', r'en \1 består', text, flags=re.IGNORECASE)
+    text = _DET_AR_EN_BESTAR_RE.sub(r'en \1 består', text)
     
     # Fix "vi definierar" -> "vi definierar" (ensure correct form)
-    text = re.sub(r'\bdefinierar vi\b', 'definierar vi', text, flags=re.IGNORECASE)
+    text = _DEFINIERAR_VI_RE.sub('definierar vi', text)
     
     # Remove excessive filler words (common in speech)
     # Be conservative - only remove obvious duplicates
-    text = re.sub(r'\b(ja|alltså|liksom|typ)\s+\1\b', r'\1', text, flags=re.IGNORECASE)
+    text = _REPEATED_FILLER_RE.sub(r'\1', text)
     
     # Fix common Swedish word order issues
     # "det här är" -> "detta är" (more formal/written)
-    text = re.sub(r'\bdet här är\b', 'detta är', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bdet här\b', 'detta', text, flags=re.IGNORECASE)
+    text = _DET_HAR_AR_RE.sub('detta är', text)
+    text = _DET_HAR_RE.sub('detta', text)
     
-    # Remove empty lines and normalize line breaks
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    text = ' '.join(lines)  # Join all lines with space
-    
-    # Final cleanup
-    text = re.sub(r'\s+', ' ', text)  # Final whitespace normalization
-    text = text.strip()
+    # Final cleanup: remove empty lines, join with space, collapse whitespace and strip
+    # (str.split() utan argument delar på samma blanktecken som \s)
+    text = ' '.join(text.split())
     
     # Ensure text starts with capital letter
     if text and text[0].islower():
@@ -837,6 +1121,24 @@ def normalize_transcript_text(raw_text: str, use_enhanced: bool = True) -> str:
     return text
 
 
+# Patterns för _apply_masterclass_enhancements
+_BORJA_VERB_RE = re.compile(r'\bbörja (gråta|prata|tala|jobba|arbeta)\b', re.IGNORECASE)
+_GORA_JOBB_RE = re.compile(r'\bgöra (ett|en) (bra|dåligt) (jobb|arbete)\b', re.IGNORECASE)
+# Fasta ord-ersättningar i ett pass. Ersättningarna är hela ord och varken skapar eller tar bort
+# träffar för varandra eller för "det är en X består", så ordningen i pipelinen påverkas inte.
+_MASTERCLASS_FIXUPS = {
+    'plasskar': 'plaskar',
+    'själva': 'själv',
+    'längt': 'länge',
+    'inom form av': 'i form av',
+    'sån': 'sådan',
+}
+_MASTERCLASS_FIXUP_RE = _word_alternation(_MASTERCLASS_FIXUPS)
+_SENTENCE_START_TIGHT_RE = re.compile(r'([.!?])\s*([a-zåäö])')
+_PUNCT_CHARS = '.,!?;:'
+_SPACE_AFTER_PUNCT_RE = re.compile(r'([.,!?;:])([^\s])')
+
+
 # MASTERCLASS: Enhanced transcript improvements
 def _apply_masterclass_enhancements(text: str) -> str:
     """
@@ -844,39 +1146,35 @@ def _apply_masterclass_enhancements(text: str) -> str:
     Includes Swedish word list checking, verb form correction, and advanced structure improvements.
     """
     # Fix verb forms: "börja gråta" -> "börjar gråta"
-    text = re.sub(r'\bbörja (gråta|prata|tala|jobba|arbeta)\b', r'börjar \1', text, flags=re.IGNORECASE)
+    text = _BORJA_VERB_RE.sub(r'börjar \1', text)
     
     # Fix "göra ett bra jobb" -> "gör ett bra jobb"
-    text = re.sub(r'\bgöra (ett|en) (bra|dåligt) (jobb|arbete)\b', r'gör \1 \2 \3', text, flags=re.IGNORECASE)
+    text = _GORA_JOBB_RE.sub(r'gör \1 \2 \3', text)
     
-    # Fix common mishearings: "plasskar" -> "plaskar", "själva" -> "själv" (when appropriate)
-    text = re.sub(r'\bplasskar\b', 'plaskar', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bsjälva\b', 'själv', text, flags=re.IGNORECASE)
-    text = re.sub(r'\blängt\b', 'länge', text, flags=re.IGNORECASE)
+    # Fix common mishearings and fixed phrases in one pass:
+    # "plasskar" -> "plaskar", "själva" -> "själv", "längt" -> "länge",
+    # "inom form av" -> "i form av", "sån" -> "sådan" (more formal)
+    text = _replace_words(_MASTERCLASS_FIXUP_RE, _MASTERCLASS_FIXUPS, text)
     
     # Advanced sentence structure improvements
     # Fix "det är en X består" -> "en X består"
-    text = re.sub(r'\bdet är en (\w+) består\b', r'en \1 består', text, flags=re.IGNORECASE)
-    
-    # Fix "inom form av" -> "i form av"
-    text = re.sub(r'\binom form av\b', 'i form av', text, flags=re.IGNORECASE)
-    
-    # Fix "sån" -> "sådan" (more formal)
-    text = re.sub(r'\bsån\b', 'sådan', text, flags=re.IGNORECASE)
+    text = _DET_AR_EN_BESTAR_RE.sub(r'en \1 består', text)
     
     # Enhanced punctuation: ensure proper spacing
-    text = re.sub(r'([.!?])\s*([a-zåäö])', lambda m: m.group(1) + ' ' + m.group(2).upper(), text)
+    text = _SENTENCE_START_TIGHT_RE.sub(lambda m: m.group(1) + ' ' + m.group(2).upper(), text)
     
     # Fix common Swedish grammar: "det är det" -> "det är"
-    text = re.sub(r'\bdet är det\b', 'det är', text, flags=re.IGNORECASE)
-    
-    # Normalize spacing around punctuation
-    text = re.sub(r'\s+([.,!?;:])', r'\1', text)
-    text = re.sub(r'([.,!?;:])([^\s])', r'\1 \2', text)
-    
-    # Final normalization
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
+    text = _DET_AR_DET_RE.sub('det är', text)
+    
+    # Normalize spacing around punctuation + final whitespace normalization.
+    # Kollaps först: då är blanktecken före skiljetecken exakt ett ' ' och kan tas bort med
+    # str.replace i stället för en regex (samma resultat, insättningen efter skiljetecken
+    # skapar aldrig blankteckensekvenser som behöver kollapsas igen)
+    text = ' '.join(text.split())
+    for punct in _PUNCT_CHARS:
+        if ' ' + punct in text:
+            text = text.replace(' ' + punct, punct)
+    text = _SPACE_AFTER_PUNCT_RE.sub(r'\1 \2', text)
     
     return text
 
@@ -910,6 +1208,40 @@ def generate_stub_transcript(filename: str, duration_seconds: Optional[int] = No
     return " ".join(sentences)
 
 
+# process_transcript: PII-förscan + meningsdelning (kompileras en gång vid import)
+_TRANSCRIPT_EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+', re.IGNORECASE)
+# Passen körs i sekvens: en enda alternation över alla mönster ger andra resultat där
+# träffarna överlappar (t.ex. '+46...' mot e-postens lokaldel). Mobilmönstret (\b07\d[- ]...)
+# behövs inte - det är en delmängd av "Swedish phone" som körs före.
+_TRANSCRIPT_PHONE_RES = [
+    re.compile(r'\b0\d{1,2}[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b'),  # Swedish phone (incl. mobile)
+    re.compile(r'\+\d{1,3}[- ]?\d{1,4}[- ]?\d{2,4}[- ]?\d{2,4}\b'),  # International
+]
+# YYYYMMDD-XXXX | YYYYMMDDXXXX (grenarna kan inte överlappa, så ett pass räcker)
+_TRANSCRIPT_PERSONNUMMER_RE = re.compile(r'\b(?:19|20)\d{6}[- ]\d{4}\b|\b(?:19|20)\d{10}\b')
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+\s+')
+# Keywords to prefer in Nyckelpunkter
+_KEY_POINT_KEYWORDS = ('viktigt', 'problem', 'nästa steg', 'deadline', 'källa', 'risk', 'behöver')
+_SENTENCE_SPLIT_KEEP_RE = re.compile(r'([.!?]+\s+)')
+# Giriga stycken på ord-nivå: längsta ordsekvens (enkelt mellanslag) med längd <= 349 tecken,
+# eller ett ensamt ord om det redan är längre. Samma brytpunkter som ackumulatorn
+# "len(word) + 1 per ord, bryt när summan > 350".
+_PARAGRAPH_TARGET_LENGTH = 350
+_PARAGRAPH_WRAP_RE = re.compile(r'\S(?:.{0,%d}\S)?(?= |\Z)|\S+' % (_PARAGRAPH_TARGET_LENGTH - 3))
+
+
+# Små LRU-cache för process_transcript (omkörning av samma inspelning). Nyckeln är en digest
+# av transkriptet + övriga argument - råtexten hålls aldrig som nyckel.
+_TRANSCRIPT_CACHE_SIZE = 32
+_transcript_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_transcript_cache_lock = threading.Lock()
+
+
+def _section(output_lines: List[str], heading: str) -> None:
+    """Start a markdown section: blank line after the previous content, heading, blank line."""
+    output_lines += ("", heading, "")
+
+
 def process_transcript(raw_transcript: str, project_name: str, recording_date: str, duration_seconds: Optional[int] = None) -> str:
     """
     Process raw transcript into structured markdown-like format.
@@ -922,48 +1254,60 @@ def process_transcript(raw_transcript: str, project_name: str, recording_date: s
     - Sammanfattning: First 2 sentences or ~240 chars
     - Nyckelpunkter: 3-5 bullets (prefer sentences with keywords)
     - Tidslinje: 4-8 segments with timestamps
+    
+    Deterministic in its inputs; recent results are cached in-process (bounded LRU).
     """
+    digest = hashlib.blake2b(raw_transcript.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    cache_key = (digest, project_name, recording_date, duration_seconds)
+    with _transcript_cache_lock:
+        cached = _transcript_cache.get(cache_key)
+        if cached is not None:
+            _transcript_cache.move_to_end(cache_key)
+            return cached
+    
+    result = _process_transcript(raw_transcript, project_name, recording_date, duration_seconds)
+    
+    with _transcript_cache_lock:
+        _transcript_cache[cache_key] = result
+        if len(_transcript_cache) > _TRANSCRIPT_CACHE_SIZE:
+            _transcript_cache.popitem(last=False)
+    return result
+
+
+def _process_transcript(raw_transcript: str, project_name: str, recording_date: str, duration_seconds: Optional[int]) -> str:
+    """Uncached implementation of process_transcript."""
     # Safety pre-scan: replace detected PII with tokens before processing
     # Use same patterns as masking but apply before formatting
     text = raw_transcript
     
-    # Email pattern
-    email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-    text = re.sub(email_pattern, '[EMAIL]', text, flags=re.IGNORECASE)
-    
-    # Phone patterns (similar to masking)
-    phone_patterns = [
-        r'\b0\d{1,2}[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b',  # Swedish phone
-        r'\b07\d[- ]\d{2,3}[- ]?\d{2,3}[- ]?\d{2,4}\b',      # Mobile
-        r'\+\d{1,3}[- ]?\d{1,4}[- ]?\d{2,4}[- ]?\d{2,4}\b',  # International
-    ]
-    for pattern in phone_patterns:
-        text = re.sub(pattern, '[PHONE]', text)
+    # Email pattern (kräver '@'; mönstret saknar \b och är det dyraste passet)
+    if '@' in text:
+        text = _email_sub(_TRANSCRIPT_EMAIL_RE, '[EMAIL]', text)
     
-    # Personnummer patterns
-    personnummer_patterns = [
-        r'\b(19|20)\d{6}[- ]\d{4}\b',  # YYYYMMDD-XXXX
-        r'\b(19|20)\d{10}\b',          # YYYYMMDDXXXX
-    ]
-    for pattern in personnummer_patterns:
-        text = re.sub(pattern, '[PERSONNUMMER]', text)
+    # Phone + personnummer patterns kräver siffror
+    if _DIGIT_RE.search(text):
+        # Phone patterns (similar to masking)
+        for pattern in _TRANSCRIPT_PHONE_RES:
+            text = pattern.sub('[PHONE]', text)
+        
+        # Personnummer patterns
+        text = _TRANSCRIPT_PERSONNUMMER_RE.sub('[PERSONNUMMER]', text)
     
     # Split into sentences
-    # Simple sentence splitting (period, exclamation, question mark followed by space or end)
-    sentences = re.split(r'[.!?]+\s+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
+    # Simple sentence splitting (period, exclamation, question mark followed by space or end).
+    # En split med fångad avgränsare: [mening, skiljetecken, mening, ...]. Meningarna (jämna
+    # index) är exakt vad split utan grupp ger; avgränsarna återanvänds för fullständigt transkript.
+    split_parts = _SENTENCE_SPLIT_KEEP_RE.split(text)
+    sentences = [stripped for stripped in (s.strip() for s in split_parts[::2]) if stripped]
     
     # Build output with strict markdown formatting
     # Ensure each section is separated by blank lines (\n\n)
-    output_lines = []
     
     # Title
-    output_lines.append(f"# Röstmemo – {project_name} – {recording_date}")
-    output_lines.append("")  # Blank line after title
+    output_lines = [f"# Röstmemo – {project_name} – {recording_date}"]
     
     # Sammanfattning
-    output_lines.append("## Sammanfattning")
-    output_lines.append("")  # Blank line after heading
+    _section(output_lines, "## Sammanfattning")
     if len(sentences) >= 1:
         # Build summary from sentences until we reach ~240 chars or 3-4 sentences
         summary_parts = []
@@ -999,7 +1343,7 @@ def process_transcript(raw_transcript: str, project_name: str, recording_date: s
             summary = summary[:237] + "..."
         
         # Apply presentation enhancement to summary
-        summary = enhance_presentation_text(summary)
+        summary = enhance_presentation_text(summary, pre_normalized=True)
         
         output_lines.append(summary)
     else:
@@ -1008,28 +1352,24 @@ def process_transcript(raw_transcript: str, project_name: str, recording_date: s
             output_lines.append(f"Detta är ett röstmemo med {duration_seconds} sekunder inspelning.")
         else:
             output_lines.append("Detta är ett röstmemo med inspelning.")
-    output_lines.append("")  # Blank line after summary
     
     # Nyckelpunkter
-    output_lines.append("## Nyckelpunkter")
-    output_lines.append("")  # Blank line after heading
-    
-    # Keywords to prefer
-    keywords = ['viktigt', 'problem', 'nästa steg', 'deadline', 'källa', 'risk', 'behöver']
+    _section(output_lines, "## Nyckelpunkter")
     
     # Score sentences by keyword presence and length
+    # (7 substring-koller per mening är snabbare än en regex-alternation med callback/set)
     scored_sentences = []
     for i, sent in enumerate(sentences):
         score = len(sent)  # Base score on length
         sent_lower = sent.lower()
-        for keyword in keywords:
+        for keyword in _KEY_POINT_KEYWORDS:
             if keyword in sent_lower:
                 score += 100  # Boost for keywords
         scored_sentences.append((score, i, sent))
     
-    # Sort by score (descending) and take top 3-5
-    scored_sentences.sort(reverse=True)
-    key_points = scored_sentences[:min(5, len(scored_sentences))]
+    # Take top 3-5 by score (descending); index i är unikt så ordningen är densamma som
+    # sort(reverse=True)[:5], men utan att sortera alla meningar
+    key_points = heapq.nlargest(5, scored_sentences)
     key_points = sorted(key_points, key=lambda x: x[1])  # Sort by original order
     
     # If we have fewer than 3, use longest sentences
@@ -1044,31 +1384,28 @@ def process_transcript(raw_transcript: str, project_name: str, recording_date: s
         if len(sent) > 150:
             # Try to find a sentence boundary before 150 chars
             # Look for period, exclamation, or question mark
-            break_point = -1
-            for i in range(min(150, len(sent) - 1), max(0, len(sent) - 50), -1):
-                if sent[i] in '.!?':
-                    break_point = i + 1
-                    break
+            # Sista skiljetecknet i index (max(0, len-50), min(150, len-1)] via rfind i C
+            # (samma fönster som den tidigare baklänges-loopen; -1 + 1 = 0 när inget hittas)
+            window_start = max(0, len(sent) - 50) + 1
+            window_end = min(150, len(sent) - 1) + 1
+            break_point = max(
+                sent.rfind('.', window_start, window_end),
+                sent.rfind('!', window_start, window_end),
+                sent.rfind('?', window_start, window_end),
+            ) + 1
             if break_point > 50:  # Only use if we found a reasonable break
                 sent = sent[:break_point].strip()
             else:
                 # No good break found, keep original but ensure it ends properly
                 sent = sent.strip()
         
-        # Apply presentation enhancement to key points
-        sent = enhance_presentation_text(sent)
-        
-        # Ensure it's a complete sentence (ends with punctuation)
-        if sent and sent[-1] not in '.!?':
-            sent = sent.rstrip() + '.'
+        # Apply presentation enhancement to key points (also ensures it ends with punctuation)
+        sent = enhance_presentation_text(sent, pre_normalized=True)
         
         output_lines.append(f"- {sent}")
     
-    output_lines.append("")  # Blank line after bullets
-    
     # Tidslinje
-    output_lines.append("## Tidslinje")
-    output_lines.append("")  # Blank line after heading
+    _section(output_lines, "## Tidslinje")
     
     # Chunk transcript into 4-8 segments
     num_segments = min(8, max(4, len(sentences) // 3))
@@ -1098,20 +1435,16 @@ def process_transcript(raw_transcript: str, project_name: str, recording_date: s
                 first_sent = first_sent[:117] + "..."
             output_lines.append(f"{timestamp} {first_sent}")
     
-    output_lines.append("")  # Blank line after timeline
-    
     # Fullständigt transkript
-    output_lines.append("## Fullständigt transkript")
-    output_lines.append("")  # Blank line after heading
+    _section(output_lines, "## Fullständigt transkript")
     
     # Format full transcript with paragraph breaks for readability
     # IMPORTANT: Use original text (after PII masking) to preserve exact content
     # Only add paragraph breaks - do NOT modify content
     original_text_for_full = text  # This is already PII-masked but unenhanced
     
-    # Split into sentences preserving original punctuation
-    # Use the same sentence splitting as above but keep original text
-    original_sentences_list = re.split(r'([.!?]+\s+)', original_text_for_full)
+    # Sentences preserving original punctuation (same split as above, already computed)
+    original_sentences_list = split_parts
     
     # Reconstruct sentences with their original punctuation
     full_sentences = []
@@ -1128,32 +1461,21 @@ def process_transcript(raw_transcript: str, project_name: str, recording_date: s
             i += 1
     
     # If that didn't work, use simple approach: split by period and keep original
-    if not full_sentences or len(' '.join(full_sentences)) != len(original_text_for_full.replace(' ', '')):
+    # Längdjämförelsen räknas utan att bygga två kopior av hela transkriptet:
+    # len(' '.join(xs)) == sum(len) + len(xs) - 1, len(t.replace(' ', '')) == len(t) - t.count(' ')
+    if not full_sentences or (
+        sum(map(len, full_sentences)) + len(full_sentences) - 1
+        != len(original_text_for_full) - original_text_for_full.count(' ')
+    ):
         # Fallback: use original text directly, just add paragraph breaks by length
-        target_paragraph_length = 350
-        paragraphs = []
-        words = original_text_for_full.split()
-        current_para = []
-        current_len = 0
-        
-        for word in words:
-            word_len = len(word) + 1  # +1 for space
-            if current_len + word_len > target_paragraph_length and current_para:
-                paragraphs.append(' '.join(current_para))
-                current_para = [word]
-                current_len = word_len
-            else:
-                current_para.append(word)
-                current_len += word_len
-        
-        if current_para:
-            paragraphs.append(' '.join(current_para))
+        # (ett findall-pass i C över den blankteckens-normaliserade texten i stället för en ordloop)
+        paragraphs = _PARAGRAPH_WRAP_RE.findall(' '.join(original_text_for_full.split()))
     else:
         # Group sentences into paragraphs
         paragraphs = []
         current_paragraph = []
         current_length = 0
-        target_paragraph_length = 350
+        target_paragraph_length = _PARAGRAPH_TARGET_LENGTH
         max_sentences_per_paragraph = 5
         
         for sent in full_sentences:
@@ -1178,14 +1500,40 @@ def process_transcript(raw_transcript: str, project_name: str, recording_date: s
         if i < len(paragraphs) - 1:
             output_lines.append("")  # Blank line between paragraphs
     
-    # Join with newlines and ensure no trailing whitespace
-    result = "\n".join(output_lines)
-    # Remove any trailing whitespace from each line
-    result_lines = [line.rstrip() for line in result.split('\n')]
+    # Remove any trailing whitespace from each line and join with newlines. Bara rader med
+    # inbäddade radbrytningar (stycken/meningar ur transkriptet) behöver delas upp först,
+    # så hela dokumentet byggs en gång i stället för join + split + join.
+    result_lines = []
+    for line in output_lines:
+        if '\n' in line:
+            result_lines.extend([part.rstrip() for part in line.split('\n')])
+        else:
+            result_lines.append(line.rstrip())
     return "\n".join(result_lines)
 
 
-def enhance_presentation_text(text: str) -> str:
+# Common STT mishearings and spelling corrections (whole words, one pass, case-insensitive)
+_PRESENTATION_WORD_FIXES = {
+    # Common Swedish STT errors
+    'drare': 'drar',
+    'nerjonat': 'nedtonat',
+    'nertjonat': 'nedtonat',
+    'viset': 'visst',
+    'sås': 'sådan',
+    'sån': 'sådan',
+    # Spelling corrections
+    'våran': 'vår',
+    'definerar': 'definierar',
+    'definierar': 'definierar',  # Already correct, but ensure consistency
+}
+_PRESENTATION_WORD_FIX_RE = _word_alternation(_PRESENTATION_WORD_FIXES)
+# Remove incomplete sentence markers
+_TRAILING_ELLIPSIS_RE = re.compile(r'\.\.\.\s*$')  # Complete trailing ...
+_REDUNDANT_ELLIPSIS_RE = re.compile(r'\.\.\.\s*\.')  # Remove redundant ...
+_LEADING_FILLER_RE = re.compile(r'^(?:Och|Men|Så|Då)\s+', re.IGNORECASE)
+
+
+def enhance_presentation_text(text: str, pre_normalized: bool = False) -> str:
     """
     Light presentation enhancement for summary and key points ONLY.
     
@@ -1197,49 +1545,120 @@ def enhance_presentation_text(text: str) -> str:
     - NO addition of new information
     
     This is a presentation layer - original transcript remains unchanged.
+    
+    Args:
+        text: Summary or key point text
+        pre_normalized: Caller guarantees text is non-empty and already stripped
+            (process_transcript), so the strip() checks can be skipped
+    
+    Returns:
+        Enhanced text, ending with punctuation unless empty
     """
-    if not text or len(text.strip()) == 0:
+    if not pre_normalized and (not text or len(text.strip()) == 0):
         return text
     
     enhanced = text
     
-    # Common STT mishearings and spelling corrections
-    stt_fixes = {
-        # Common Swedish STT errors
-        r'\bdrare\b': 'drar',
-        r'\bnerjonat\b': 'nedtonat',
-        r'\bnertjonat\b': 'nedtonat',
-        r'\bviset\b': 'visst',
-        r'\bsås\b': 'sådan',
-        r'\bsån\b': 'sådan',
-        # Spelling corrections
-        r'\bvåran\b': 'vår',
-        r'\bdefinerar\b': 'definierar',
-        r'\bdefinierar\b': 'definierar',  # Already correct, but ensure consistency
-        # Remove incomplete sentence markers
-        r'\.\.\.\s*$': '.',  # Complete trailing ...
-        r'\.\.\.\s*\.': '.',  # Remove redundant ...
-    }
-    
-    # Apply fixes (only obvious corrections)
-    for pattern, replacement in stt_fixes.items():
-        enhanced = re.sub(pattern, replacement, enhanced, flags=re.IGNORECASE)
+    # Apply fixes (only obvious corrections). De flesta nyckelpunkter innehåller inget av
+    # orden: substring-koll på lower() (~1 µs) innan alternationen (~10 µs per sträng)
+    lowered = enhanced.lower()
+    if any(word in lowered for word in _PRESENTATION_WORD_FIXES) or any(
+        odd in enhanced for odd in _IGNORECASE_ODDITIES
+    ):
+        enhanced = _replace_words(_PRESENTATION_WORD_FIX_RE, _PRESENTATION_WORD_FIXES, enhanced, lowered)
+    # Båda ellips-mönstren kräver '...' (billig substring-koll före regexarna)
+    if '...' in enhanced:
+        enhanced = _TRAILING_ELLIPSIS_RE.sub('.', enhanced)
+        enhanced = _REDUNDANT_ELLIPSIS_RE.sub('.', enhanced)
     
     # Light linguistic simplification (only very safe patterns)
     # Remove excessive filler words at start (but keep if sentence becomes too short)
     original_start = enhanced
-    enhanced = re.sub(r'^(Och|Men|Så|Då)\s+', '', enhanced, flags=re.IGNORECASE)
-    # But only if sentence is still meaningful
-    if len(enhanced.strip()) < 10:
+    enhanced = _LEADING_FILLER_RE.sub('', enhanced)
+    # But only if sentence is still meaningful. Strippad indata förblir strippad genom stegen
+    # ovan (ellipserna ersätts inklusive efterföljande blanktecken, utfyllnaden inklusive \s+).
+    if len(enhanced if pre_normalized else enhanced.strip()) < 10:
         enhanced = original_start  # Revert if too aggressive
     
     # Ensure sentence ends with punctuation
     if enhanced and enhanced[-1] not in '.!?':
-        enhanced = enhanced.rstrip() + '.'
+        enhanced = (enhanced if pre_normalized else enhanced.rstrip()) + '.'
     
     return enhanced
 
 
+# Common Swedish speech signals to trim from bullet points (applied in order, anchored at start)
+_SPEECH_SIGNAL_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'^och\s+',
+    r'^det här\s+',
+    r'^detta\s+',
+    r'^jag tycker\s+',
+    r'^jag tror\s+',
+    r'^jag tror att\s+',
+    r'^tycker jag\s+',
+    r'^tror jag\s+',
+    r'^alltså\s+',
+    r'^så\s+',
+    r'^sen\s+',
+    r'^sedan\s+',
+    r'^då\s+',
+    r'^men\s+',
+    r'^eller\s+',
+    r'^så att\s+',
+    r'^så att säga\s+',
+))
+
+# Fix common speech patterns: "det det" -> "det" etc. Fraserna delar inga ord, så en
+# alternation ger samma resultat som fyra pass i följd.
+_REDUPLICATION_FIXES = {
+    'det det': 'det',
+    'är är': 'är',
+    'kan kan': 'kan',
+    'ska ska': 'ska',
+}
+
+
+# Speech-to-written Swedish transformations (deterministic mappings, applied in order).
+# Varje steg har literaler som måste finnas i text.lower() för att mönstret ska kunna matcha.
+# Utfyllnadsorden körs som separata pass: "a alltså typ b" och "alltså alltså" kaskaderar.
+_SPEECH_TO_WRITTEN = (
+    # "det är" -> "det" (remove redundant "är")
+    (re.compile(r'\bdet är\s+', re.IGNORECASE), 'det ', ('det är',)),
+    # "det här" -> "detta" (more formal)
+    (re.compile(r'\bdet här\s+', re.IGNORECASE), 'detta ', ('det här',)),
+    # Remove filler words in middle of sentences
+    (re.compile(r'\s+alltså\s+', re.IGNORECASE), ' ', ('alltså',)),
+    (re.compile(r'\s+så att säga\s+', re.IGNORECASE), ' ', ('så att säga',)),
+    (re.compile(r'\s+typ\s+', re.IGNORECASE), ' ', ('typ',)),
+    (_word_alternation(_REDUPLICATION_FIXES), _REDUPLICATION_FIXES, tuple(_REDUPLICATION_FIXES)),
+)
+
+
+def _apply_speech_to_written(text: str) -> str:
+    """Apply _SPEECH_TO_WRITTEN in order, skipping steps whose literals are absent."""
+    lowered = text.lower()
+    has_oddities = any(odd in text for odd in _IGNORECASE_ODDITIES)
+    for pattern, replacement, literals in _SPEECH_TO_WRITTEN:
+        if has_oddities or any(literal in lowered for literal in literals):
+            if isinstance(replacement, dict):
+                replaced = _replace_words(pattern, replacement, text, lowered)
+            else:
+                replaced = pattern.sub(replacement, text)
+            if replaced is not text:
+                # Ett steg kan skapa träffar för nästa ("det är det" -> "det det")
+                text = replaced
+                lowered = text.lower()
+    return text
+
+
+_WORD_RE = re.compile(r'\b\w+\b')
+# Stop words excluded from the condensed Sammanfattning conclusion
+_CONCLUSION_STOP_WORDS = frozenset({
+    'detta', 'finns', 'skulle', 'borde', 'bör', 'kanske', 'möjligt', 'eller',
+    'också', 'även', 'där', 'här', 'denna', 'denne',
+})
+
+
 def refine_editorial_text(structured_text: str) -> str:
     """
     Refine structured transcript text to editorial-ready first draft (deterministic).
@@ -1264,47 +1683,6 @@ def refine_editorial_text(structured_text: str) -> str:
     output_lines = []
     i = 0
     
-    # Common Swedish speech signals to trim from bullet points
-    speech_signals = [
-        r'^och\s+',
-        r'^det här\s+',
-        r'^detta\s+',
-        r'^jag tycker\s+',
-        r'^jag tror\s+',
-        r'^jag tror att\s+',
-        r'^tycker jag\s+',
-        r'^tror jag\s+',
-        r'^alltså\s+',
-        r'^så\s+',
-        r'^sen\s+',
-        r'^sedan\s+',
-        r'^då\s+',
-        r'^men\s+',
-        r'^eller\s+',
-        r'^så att\s+',
-        r'^så att säga\s+',
-    ]
-    
-    # Speech-to-written Swedish transformations (deterministic mappings)
-    speech_to_written = {
-        # "det är" -> "det" (remove redundant "är")
-        r'\bdet är\s+': 'det ',
-        # "det här" -> "detta" (more formal)
-        r'\bdet här\s+': 'detta ',
-        # "så att" -> "så att" (keep, but can be context-dependent)
-        # "om vi" -> "om vi" (keep)
-        # "det kan" -> "det kan" (keep)
-        # Remove filler words in middle of sentences
-        r'\s+alltså\s+': ' ',
-        r'\s+så att säga\s+': ' ',
-        r'\s+typ\s+': ' ',
-        # Fix common speech patterns
-        r'\bdet det\b': 'det',
-        r'\bär är\b': 'är',
-        r'\bkan kan\b': 'kan',
-        r'\bska ska\b': 'ska',
-    }
-    
     # Process line by line
     in_sammanfattning = False
     in_nyckelpunkter = False
@@ -1340,10 +1718,7 @@ def refine_editorial_text(structured_text: str) -> str:
                 sammanfattning_start_idx = len(output_lines)
             sammanfattning_lines.append(line)
             # Apply speech-to-written transformations
-            refined_line = line
-            for pattern, replacement in speech_to_written.items():
-                refined_line = re.sub(pattern, replacement, refined_line, flags=re.IGNORECASE)
-            output_lines.append(refined_line)
+            output_lines.append(_apply_speech_to_written(line))
             i += 1
             continue
         
@@ -1352,12 +1727,14 @@ def refine_editorial_text(structured_text: str) -> str:
             bullet_text = line[2:].strip()  # Remove "- " prefix
             
             # Trim speech signals from beginning
-            for signal_pattern in speech_signals:
-                bullet_text = re.sub(signal_pattern, '', bullet_text, flags=re.IGNORECASE)
+            # (mönstren är ^-förankrade: match + slice i stället för sub)
+            for signal_pattern in _SPEECH_SIGNAL_RES:
+                signal = signal_pattern.match(bullet_text)
+                if signal:
+                    bullet_text = bullet_text[signal.end():]
             
             # Apply speech-to-written transformations
-            for pattern, replacement in speech_to_written.items():
-                bullet_text = re.sub(pattern, replacement, bullet_text, flags=re.IGNORECASE)
+            bullet_text = _apply_speech_to_written(bullet_text)
             
             # Ensure bullet starts with noun or verb
             # Simple heuristic: check if starts with common Swedish verbs or nouns
@@ -1396,13 +1773,13 @@ def refine_editorial_text(structured_text: str) -> str:
     if sammanfattning_start_idx != -1 and len(sammanfattning_lines) > 0:
         # Count sentences in Sammanfattning
         sammanfattning_text = ' '.join(sammanfattning_lines)
-        sentences = re.split(r'[.!?]+\s+', sammanfattning_text)
-        sentences = [s.strip() for s in sentences if s.strip() and len(s.strip()) > 5]
+        sentences = _SENTENCE_SPLIT_RE.split(sammanfattning_text)
+        sentences = [stripped for stripped in (s.strip() for s in sentences) if len(stripped) > 5]
         
         if len(sentences) < 2:
             # Extract key words from existing text for condensed conclusion
             # Use words from Nyckelpunkter and Sammanfattning (no new info)
-            all_words = []
+            word_sources = []
             
             # Find Nyckelpunkter section and extract words from bullets
             in_nyckelpunkter_section = False
@@ -1415,36 +1792,39 @@ def refine_editorial_text(structured_text: str) -> str:
                     continue
                 
                 if in_nyckelpunkter_section and line.strip().startswith("- "):
-                    bullet_text = line[2:].strip()
-                    all_words.extend(re.findall(r'\b\w+\b', bullet_text.lower()))
+                    word_sources.append(line[2:].strip())
             
             # Add words from Sammanfattning
-            all_words.extend(re.findall(r'\b\w+\b', sammanfattning_text.lower()))
+            word_sources.append(sammanfattning_text)
             
             # Find common important words (nouns, verbs - simple heuristic)
-            # Filter out common stop words
-            stop_words = {'detta', 'detta', 'finns', 'skulle', 'borde', 'bör', 'kanske', 'möjligt', 'eller', 'också', 'även', 'där', 'här', 'där', 'denna', 'detta', 'denne'}
-            important_words = [w for w in all_words if len(w) > 4 and w not in stop_words]
+            # Filter out common stop words; räknas direkt utan mellanliggande ordlistor
+            word_counts = Counter(
+                word
+                for source in word_sources
+                for word in _WORD_RE.findall(source.lower())
+                if len(word) > 4 and word not in _CONCLUSION_STOP_WORDS
+            )
             
             # Create simple conclusion based on existing content
             # Just extract key concept and make a simple statement
-            if important_words:
-                # Use most common word or a key concept
-                word_counts = Counter(important_words)
-                top_words = [w for w, _ in word_counts.most_common(3)]
+            if word_counts:
+                # Use most common word (max ger första ordet vid lika antal, som most_common)
+                top_word = max(word_counts, key=word_counts.get)
                 
                 # Build simple conclusion sentence using existing patterns
-                conclusion = f"Detta fokuserar på {top_words[0] if top_words else 'huvudpunkterna'}."
+                conclusion = f"Detta fokuserar på {top_word}."
             else:
                 conclusion = "Detta sammanfattar huvudpunkterna."
             
             # Insert conclusion after existing Sammanfattning content
             # Find where to insert (after last line of Sammanfattning, before blank line)
+            # (en enda insert per anrop, O(n) - ingen kvadratisk kostnad)
             insert_idx = sammanfattning_start_idx + len(sammanfattning_lines)
             output_lines.insert(insert_idx, conclusion)
     
-    # Join and return
-    result = "\n".join(output_lines)
-    result_lines = [line.rstrip() for line in result.split('\n')]
-    return "\n".join(result_lines)
+    # Join and return. Varje element är redan exakt en rad (indata delades på '\n' och
+    # ingen transform lägger till radbrytningar), så rstrip per element räcker - ingen
+    # join -> split -> join-rundtur.
+    return "\n".join([line.rstrip() for line in output_lines])
 
@@ -6,6 +6,13 @@ set -e
 MODEL_DIR="$HOME/.cache/fortknox/models"
 PORT=${1:-8080}
 THREADS=${2:-4}
+# Parallella sekvens-slots: samtidiga /compile-anrop avkodas i samma batch (continuous
+# batching) i stället för att köa. Varje slot får 4096 tokens kontext (KV-cache x PARALLEL).
+PARALLEL=${LLAMA_PARALLEL:-2}
+CTX_PER_SLOT=4096
+# Prompt-prefill: logisk batch 2048 (hela prompten i få steg), fysisk 512 per decode-anrop
+N_BATCH=${LLAMA_N_BATCH:-2048}
+N_UBATCH=${LLAMA_N_UBATCH:-512}
 
 # Find model (prioritera Ministral-3-8B, annars Mistral 7B, annars första GGUF)
 MODEL=$(find "$MODEL_DIR" -name "*ministral*8b*.gguf" -type f | head -1)
@@ -26,6 +33,7 @@ echo "Startar llama.cpp server..."
 echo "  Model: $MODEL"
 echo "  Port: $PORT"
 echo "  Threads: $THREADS"
+echo "  Parallel slots: $PARALLEL"
 echo ""
 
 # Find llama-server
@@ -51,7 +59,11 @@ echo ""
 "$LLAMA_SERVER" \
     -m "$MODEL" \
     --port "$PORT" \
-    --ctx-size 4096 \
+    --ctx-size $((CTX_PER_SLOT * PARALLEL)) \
+    --parallel "$PARALLEL" \
+    --cont-batching \
+    --batch-size "$N_BATCH" \
+    --ubatch-size "$N_UBATCH" \
     --n-predict 2048 \
     --threads "$THREADS" \
     --host 0.0.0.0
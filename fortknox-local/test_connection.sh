@@ -10,7 +10,7 @@ echo ""
 echo "1. Testar Python dependencies..."
 cd "$(dirname "$0")"
 source venv/bin/activate
-python3 -c "import fastapi, uvicorn, pydantic, requests; print('   ✅ All dependencies OK')" || {
+python3 -c "import fastapi, uvicorn, pydantic, httpx, orjson; print('   ✅ All dependencies OK')" || {
     echo "   ❌ Dependencies saknas"
     echo "   Kör: pip install -r requirements.txt"
     exit 1
@@ -2,9 +2,10 @@
 Unit tests för court_rss_watcher.py
 """
 import html
+import io
 import tempfile
 from pathlib import Path
-from unittest.mock import patch, mock_open
+from unittest.mock import MagicMock, patch, mock_open
 import pytest
 
 # Importera modulen
@@ -17,9 +18,15 @@ from court_rss_watcher import (
     get_new_items,
     load_last_guid,
     save_last_guid,
-    format_pub_date
+    format_pub_date,
+    unescape_html,
+    fetch_rss,
+    load_http_validators,
+    save_http_validators,
+    main
 )
 import feedparser
+import requests
 
 
 # Minimal RSS-sträng med a10:content namespace
@@ -46,9 +53,22 @@ MINIMAL_RSS = """<?xml version="1.0" encoding="UTF-8"?>
 </rss>"""
 
 
-def test_parse_entry_with_a10_content():
+def _fake_response(status_code: int = 200, body: bytes = b'', headers: dict = None) -> MagicMock:
+    """requests.Response-liknande mock för fetch_rss (stream=True + with-block)."""
+    response = MagicMock(status_code=status_code, headers=headers or {}, raw=io.BytesIO(body))
+    response.__enter__.return_value = response
+    return response
+
+
+@pytest.fixture(scope="module")
+def parsed_feed():
+    """MINIMAL_RSS parse:as en gång per modul; testerna läser bara från resultatet."""
+    return feedparser.parse(MINIMAL_RSS)
+
+
+def test_parse_entry_with_a10_content(parsed_feed):
     """Test att items parse:as korrekt och a10:content blir unescaped."""
-    feed = feedparser.parse(MINIMAL_RSS)
+    feed = parsed_feed
     
     assert len(feed.entries) == 2
     
@@ -80,10 +100,10 @@ def test_parse_entry_with_a10_content():
     assert item2['link'] == 'https://example.com/post2'
 
 
-def test_html_unescape():
+def test_html_unescape(parsed_feed):
     """Test att HTML-unescape fungerar korrekt."""
     # Test att parse_entry unescape:ar content
-    feed = feedparser.parse(MINIMAL_RSS)
+    feed = parsed_feed
     entry = feed.entries[0]
     
     item = parse_entry(entry)
@@ -95,9 +115,22 @@ def test_html_unescape():
         assert '&gt;' not in item['content'] or item['content'].count('&gt;') < item['content'].count('>')
 
 
-def test_get_new_items():
+def test_unescape_html_matches_stdlib():
+    """Test att snabbvägen ger samma resultat som html.unescape."""
+    cases = [
+        'ingen entitet',
+        '&lt;p&gt;a &amp; b &quot;c&quot; &#39;d&#39;&lt;/p&gt;',
+        '&amp;lt;b&amp;gt;',  # dubbel-escaped: bara ett steg
+        '&nbsp;&lt;&#229;',  # andra entiteter -> html.unescape
+        '&lt utan semikolon & ensamt',
+    ]
+    for text in cases:
+        assert unescape_html(text) == html.unescape(text)
+
+
+def test_get_new_items(parsed_feed):
     """Test att 'new since last_guid' fungerar."""
-    feed = feedparser.parse(MINIMAL_RSS)
+    feed = parsed_feed
     
     # Test 1: Inget last_guid (första körningen) - alla items är nya
     new_items = get_new_items(feed, None)
@@ -119,32 +152,166 @@ def test_get_new_items():
     assert len(new_items) == 2
 
 
+def test_get_new_items_seen_guids(parsed_feed):
+    """Test att seen_guids ersätter last_guid och filtrerar oavsett ordning."""
+    new_items = get_new_items(parsed_feed, None, {'https://example.com/post1'})
+    assert [item['guid'] for item in new_items] == ['https://example.com/post2']
+    
+    # last_guid ignoreras när seen_guids är angivet
+    new_items = get_new_items(parsed_feed, 'https://example.com/post2', set())
+    assert len(new_items) == 2
+    
+    new_items = get_new_items(parsed_feed, None, {'https://example.com/post1', 'https://example.com/post2'})
+    assert new_items == []
+
+
 def test_load_and_save_last_guid():
     """Test att load och save last_guid fungerar."""
     with tempfile.TemporaryDirectory() as tmpdir:
         # Skapa state-mapp
         state_dir = Path(tmpdir) / ".state"
         state_dir.mkdir(exist_ok=True)
-        state_file = state_dir / "test_guid.txt"
-        
-        # Mock state file path och dir
-        with patch('court_rss_watcher.STATE_FILE', state_file):
-            with patch('court_rss_watcher.STATE_DIR', state_dir):
-                # Test save
-                save_last_guid('test-guid-123')
-                assert state_file.exists()
-                
-                # Test load
-                loaded_guid = load_last_guid()
-                assert loaded_guid == 'test-guid-123'
+        state_file = state_dir / "test_last_guid.txt"
         
-        # Test load när filen inte finns
-        non_existent = Path(tmpdir) / "nonexistent.txt"
-        with patch('court_rss_watcher.STATE_FILE', non_existent):
-            loaded_guid = load_last_guid()
+        # Mock state dir
+        with patch('court_rss_watcher.STATE_DIR', state_dir):
+            # Test save
+            save_last_guid('test', 'test-guid-123')
+            assert state_file.exists()
+            
+            # Test load
+            loaded_guid = load_last_guid('test')
+            assert loaded_guid == 'test-guid-123'
+            
+            # Test load när filen inte finns
+            loaded_guid = load_last_guid('nonexistent')
             assert loaded_guid is None
 
 
+def test_save_last_guid_is_atomic():
+    """Test att en avbruten skrivning lämnar föregående state orört."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch('court_rss_watcher.STATE_DIR', Path(tmpdir) / ".state"):
+            save_last_guid('test', 'guid-1')
+            
+            with patch('court_rss_watcher.os.replace', side_effect=KeyboardInterrupt):
+                with pytest.raises(KeyboardInterrupt):
+                    save_last_guid('test', 'guid-2')
+            
+            assert load_last_guid('test') == 'guid-1'
+
+
+def test_fetch_rss_conditional_get():
+    """Test att ETag/Last-Modified skickas, sparas och att 304 inte parse:as."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        state_dir = Path(tmpdir) / ".state"
+        
+        with patch('court_rss_watcher.STATE_DIR', state_dir):
+            # Första körningen: inga validators, 200 med ETag/Last-Modified
+            assert load_http_validators('test') == {}
+            ok = _fake_response(200, MINIMAL_RSS.encode('utf-8'),
+                                {'ETag': '"abc"', 'Last-Modified': 'Mon, 01 Jan 2024 12:00:00 GMT'})
+            with patch('requests.Session.get', return_value=ok) as get:
+                feed = fetch_rss('test', 'https://example.com/feed')
+            assert 'If-None-Match' not in get.call_args.kwargs['headers']
+            assert len(feed.entries) == 2
+            
+            save_http_validators('test', feed.get('etag'), feed.get('modified'))
+            assert load_http_validators('test') == {
+                'etag': '"abc"',
+                'last_modified': 'Mon, 01 Jan 2024 12:00:00 GMT',
+            }
+            
+            # Andra körningen: validators skickas, 304 ger tomt flöde utan parse
+            not_modified = _fake_response(304)
+            with patch('requests.Session.get', return_value=not_modified) as get, \
+                    patch('court_rss_watcher.feedparser.parse') as parse:
+                feed = fetch_rss('test', 'https://example.com/feed')
+            headers = get.call_args.kwargs['headers']
+            assert headers['If-None-Match'] == '"abc"'
+            assert headers['If-Modified-Since'] == 'Mon, 01 Jan 2024 12:00:00 GMT'
+            parse.assert_not_called()
+            assert feed.entries == []
+            assert not feed.bozo
+            
+            # Server utan validators: samma body (samma SHA-256) som förra gången parse:as inte
+            body = MINIMAL_RSS.encode('utf-8')
+            with patch('requests.Session.get', return_value=_fake_response(200, body)):
+                feed = fetch_rss('test', 'https://example.com/feed')
+            assert len(feed.entries) == 2
+            save_http_validators('test', None, None, feed['body_sha256'])
+            
+            with patch('requests.Session.get', return_value=_fake_response(200, body)), \
+                    patch('court_rss_watcher.feedparser.parse') as parse:
+                feed = fetch_rss('test', 'https://example.com/feed')
+            parse.assert_not_called()
+            assert feed.entries == []
+
+
+def test_main_multiple_feeds(capsys):
+    """Test att flera feeds hämtas och att en feed som fallerar inte stoppar de andra."""
+    feeds = [("ok", "https://example.com/ok"), ("down", "https://example.com/down")]
+    
+    def fake_get(url, **kwargs):
+        if url.endswith('/down'):
+            raise requests.exceptions.ConnectionError("down")
+        return _fake_response(200, MINIMAL_RSS.encode('utf-8'))
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch('court_rss_watcher.STATE_DIR', Path(tmpdir) / ".state"), \
+                patch('court_rss_watcher.FEEDS', feeds), \
+                patch('requests.Session.get', side_effect=fake_get):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+            assert exc_info.value.code == 1
+            assert load_last_guid('ok') == 'https://example.com/post1'
+            assert load_last_guid('down') is None
+    
+    out = capsys.readouterr().out.splitlines()
+    assert out == [
+        '[ok] 2024-01-01 12:00:00 | Test Post 1 | https://example.com/post1',
+        '[ok] 2024-01-02 14:30:00 | Test Post 2 | https://example.com/post2',
+    ]
+
+
+def test_main_rotated_feed(capsys):
+    """Test att ett roterat flöde (last_guid borttagen) bara rapporterar verkligt nya poster."""
+    rotated_rss = MINIMAL_RSS.replace('post1', 'post3').replace('Test Post 1', 'Test Post 3')
+    bodies = [MINIMAL_RSS, MINIMAL_RSS, rotated_rss]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch('court_rss_watcher.STATE_DIR', Path(tmpdir) / ".state"), \
+                patch('court_rss_watcher.FEEDS', [("test", "https://example.com/feed")]), \
+                patch('requests.Session.get',
+                      side_effect=lambda url, **kwargs: _fake_response(200, bodies.pop(0).encode('utf-8'))):
+            main()
+            assert len(capsys.readouterr().out.splitlines()) == 2
+            
+            main()
+            assert capsys.readouterr().out.splitlines() == ['Inget nytt']
+            
+            # post1 borttagen, post3 ny: bara post3 rapporteras (inte post2 igen)
+            main()
+            assert capsys.readouterr().out.splitlines() == [
+                '2024-01-01 12:00:00 | Test Post 3 | https://example.com/post3',
+            ]
+
+
+def test_main_interval_polls_until_interrupted(capsys):
+    """Test att --interval pollar i loop och att andra varvet bara ser redan rapporterade poster."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with patch('court_rss_watcher.STATE_DIR', Path(tmpdir) / ".state"), \
+                patch('court_rss_watcher.FEEDS', [("test", "https://example.com/feed")]), \
+                patch('requests.Session.get',
+                      side_effect=lambda url, **kwargs: _fake_response(200, MINIMAL_RSS.encode('utf-8'))) as get, \
+                patch('court_rss_watcher.time.sleep', side_effect=[None, KeyboardInterrupt]):
+            with pytest.raises(KeyboardInterrupt):
+                main(['--interval', '60'])
+    
+    assert get.call_count == 2
+    assert capsys.readouterr().out.splitlines()[-1] == 'Inget nytt'
+
+
 def test_format_pub_date():
     """Test att format_pub_date fungerar."""
     from datetime import datetime
@@ -154,6 +321,10 @@ def test_format_pub_date():
     formatted = format_pub_date(dt)
     assert formatted == '2024-01-15 14:30:00'
     
+    # Test med time.struct_time (som parse_entry returnerar)
+    formatted = format_pub_date(dt.timetuple())
+    assert formatted == '2024-01-15 14:30:00'
+    
     # Test med None
     formatted = format_pub_date(None)
     assert formatted == 'Inget datum'
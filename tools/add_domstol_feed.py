@@ -9,7 +9,7 @@ from pathlib import Path
 # Lägg till apps/api i path för att importera modeller
 sys.path.insert(0, str(Path(__file__).parent.parent / "apps" / "api"))
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert, select, update
 from sqlalchemy.orm import sessionmaker
 from models import ScoutFeed, Base
 import os
@@ -28,29 +28,35 @@ def add_domstol_feed():
     db = SessionLocal()
     
     try:
-        # Kontrollera om feeden redan finns
-        existing = db.query(ScoutFeed).filter(
-            ScoutFeed.url == "https://www.domstol.se/feed/56/?searchPageId=1139&scope=news"
+        # Kontrollera om feeden redan finns (bara id/is_enabled, inte hela raden).
+        # Ingen ON CONFLICT-upsert: scout_feeds.url är inte unik (API:t tillåter dubbletter
+        # och placeholder-URL:er), så det finns inget konfliktmål att luta sig mot.
+        existing = db.execute(
+            select(ScoutFeed.id, ScoutFeed.is_enabled)
+            .where(ScoutFeed.url == "https://www.domstol.se/feed/56/?searchPageId=1139&scope=news")
+            .limit(1)
         ).first()
         
         if existing:
             print(f"Feeden 'Göteborgs tingsrätt' finns redan (ID: {existing.id})")
             if not existing.is_enabled:
-                existing.is_enabled = True
+                db.execute(update(ScoutFeed).where(ScoutFeed.id == existing.id).values(is_enabled=True))
                 db.commit()
                 print("Feeden har aktiverats.")
             return
         
-        # Skapa ny feed
-        feed = ScoutFeed(
-            name="Göteborgs tingsrätt",
-            url="https://www.domstol.se/feed/56/?searchPageId=1139&scope=news",
-            is_enabled=True
-        )
-        db.add(feed)
+        # Skapa ny feed; id kommer tillbaka via RETURNING i samma INSERT (ingen refresh-SELECT)
+        feed_id = db.execute(
+            insert(ScoutFeed)
+            .values(
+                name="Göteborgs tingsrätt",
+                url="https://www.domstol.se/feed/56/?searchPageId=1139&scope=news",
+                is_enabled=True
+            )
+            .returning(ScoutFeed.id)
+        ).scalar_one()
         db.commit()
-        db.refresh(feed)
-        print(f"Feeden 'Göteborgs tingsrätt' har lagts till (ID: {feed.id})")
+        print(f"Feeden 'Göteborgs tingsrätt' har lagts till (ID: {feed_id})")
         
     except Exception as e:
         print(f"Fel: {e}", file=sys.stderr)